@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Category, Product
+from .models import Category, Product, ProductTombstone
 
 
 @admin.register(Category)
@@ -25,3 +25,9 @@ class ProductAdmin(admin.ModelAdmin):
     list_filter = ("status", "is_active", "category")
     search_fields = ("name", "description")
     ordering = ("-created_at",)
+
+
+@admin.register(ProductTombstone)
+class ProductTombstoneAdmin(admin.ModelAdmin):
+    list_display = ("product_id", "deleted_at")
+    ordering = ("-deleted_at",)
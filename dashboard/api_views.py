@@ -1,10 +1,31 @@
-from rest_framework import viewsets, permissions, status
+from collections import Counter
+from collections.abc import Iterator
+
+from rest_framework import mixins, viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
-from django.db.models import Q
+from django.db.models import Count
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
 
-from .models import Product, Category
-from .serializers import ProductSerializer, ProductCreateSerializer, CategorySerializer
+from .bulk import bulk_create_products, bulk_delete_products, bulk_update_products
+from .caching import read_through
+from .changes import DEFAULT_LIMIT, MAX_LIMIT, CursorExpired, InvalidCursor, changes_since
+from .conditional import (
+    catalog_validators, category_validators, conditional, product_list_validators, product_validators
+)
+from .models import InsufficientStock, Product, Category, ReportJob
+from .pagination import ProductCursorPagination, CategoryCursorPagination
+from .parsers import NDJSONParser
+from .queries import InvalidFilters, ProductQuery
+from .reports import enqueue_report
+from .serializers import (
+    ProductSerializer, ProductCreateSerializer, CategorySerializer, ReportJobSerializer, StockAdjustmentSerializer
+)
+from .services import get_product_stats
 
 
 class IsAdminOrReadOnly(permissions.BasePermission):
@@ -21,67 +42,249 @@ class ProductViewSet(viewsets.ModelViewSet):
     """
     API endpoint for Products.
     
-    - GET /api/products/ - List all products
+    - GET /api/products/ - List all products (cursor paginated, `?count=true` adds an estimated total)
     - POST /api/products/ - Create product (Admin only)
     - GET /api/products/{id}/ - Retrieve product
     - PUT /api/products/{id}/ - Update product (Admin only)
     - DELETE /api/products/{id}/ - Delete product (Admin only)
-    - GET /api/products/search/?q=term - Search products
+    - GET /api/products/?search=term&search_mode=fts|fuzzy|contains - Search products
+    - GET /api/products/?fields=id,name,price - Sparse fieldset (list and retrieve)
+    - POST|PATCH|DELETE /api/products/bulk/ - Bulk create/update/delete (Admin only)
+    - POST /api/products/{id}/stock/ - Atomic stock adjustment (Admin only)
+    - POST /api/products/stock/ - Atomic batch of stock adjustments (Admin only)
+    - GET /api/products/changes/?cursor=... - Products changed and deleted since a cursor
     """
     permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
+    pagination_class = ProductCursorPagination
     
     def get_queryset(self):
-        queryset = Product.objects.all()
-        
-        # Search functionality
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) | Q(description__icontains=search)
-            )
-        
-        # Filter by category
-        category = self.request.query_params.get('category', None)
-        if category:
-            queryset = queryset.filter(category_id=category)
-        
-        # Filter by status
-        status_filter = self.request.query_params.get('status', None)
-        if status_filter:
-            queryset = queryset.filter(status=status_filter)
-        
-        return queryset.order_by('-created_at')
+        # Same search/category/status filters as the product list
+        try:
+            query = ProductQuery.from_params(self.request.query_params)
+        except InvalidFilters as exc:
+            raise ValidationError(exc.errors)
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            return query.queryset(columns=ProductSerializer.columns_for(fields))
+        return query.queryset('api')
+    
+    def get_sparse_fields(self):
+        """
+        Fields requested with `?fields=name,price` on list/retrieve, or None for all
+
+        Only the matching columns are fetched and serialized.
+        """
+        if self.action not in ('list', 'retrieve'):
+            return None
+        return ProductSerializer.parse_fields(self.request.query_params.get('fields'))
     
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
             return ProductCreateSerializer
         return ProductSerializer
     
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
+    
+    @method_decorator(conditional(product_list_validators))
+    def list(self, request, *args, **kwargs):
+        # Keyed by the full URL: filters, fields, cursor and the host used in links
+        data = read_through(
+            'product_list', ('api', request.build_absolute_uri()),
+            lambda: super(ProductViewSet, self).list(request, *args, **kwargs).data,
+        )
+        return Response(data)
+    
+    @method_decorator(conditional(product_validators))
+    def retrieve(self, request, *args, **kwargs):
+        data = read_through(
+            'product_detail', ('api', request.build_absolute_uri()),
+            lambda: super(ProductViewSet, self).retrieve(request, *args, **kwargs).data,
+        )
+        return Response(data)
+    
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
     
+    @action(detail=False, methods=['post', 'patch', 'delete'], parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request):
+        """
+        Create (POST), update (PATCH) or delete (DELETE) many products at once
+        
+        The body is a JSON array or an NDJSON stream (Content-Type:
+        application/x-ndjson). Updates need an `id` in every item; deletes
+        take ids or objects with an `id`. Items are applied in batched
+        transactions and each one gets its own result.
+        """
+        items = request.data
+        # A JSON array, or the item iterator of NDJSONParser
+        if not isinstance(items, (list, Iterator)):
+            raise ValidationError({'non_field_errors': ['Expected a list of items.']})
+        
+        if request.method == 'POST':
+            results = bulk_create_products(items, request.user)
+        elif request.method == 'PATCH':
+            results = bulk_update_products(items)
+        else:
+            results = bulk_delete_products(items)
+        
+        return Response({
+            'summary': dict(Counter(result['status'] for result in results)),
+            'results': results,
+        })
+    
+    @action(detail=True, methods=['post'])
+    def stock(self, request, pk=None):
+        """
+        Atomically adjust one product's stock: {"delta": -3}
+        
+        Answers 409 if the product has too little stock; nothing changes then.
+        """
+        serializer = StockAdjustmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        product = self.get_object()
+        try:
+            stock_quantity, product_status = Product.objects.adjust_stock(product.pk, serializer.validated_data['delta'])
+        except InsufficientStock as exc:
+            return Response({'detail': str(exc), 'product_ids': exc.product_ids}, status=status.HTTP_409_CONFLICT)
+        return Response({'id': product.pk, 'stock_quantity': stock_quantity, 'status': product_status})
+    
+    @action(detail=False, methods=['post'], url_path='stock', url_name='stock-batch')
+    def stock_batch(self, request):
+        """
+        Atomically adjust many products' stock in one transaction:
+        [{"id": 1, "delta": -2}, {"id": 7, "delta": 5}]
+        
+        All or nothing: answers 409 listing the products that would go below
+        zero (or do not exist) and leaves every product unchanged.
+        """
+        serializer = StockAdjustmentSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        adjustments = []
+        for item in serializer.validated_data:
+            if 'id' not in item:
+                raise ValidationError({'id': ['This field is required.']})
+            adjustments.append((item['id'], item['delta']))
+        try:
+            results = Product.objects.adjust_stock_many(adjustments)
+        except InsufficientStock as exc:
+            return Response({'detail': str(exc), 'product_ids': exc.product_ids}, status=status.HTTP_409_CONFLICT)
+        return Response([
+            {'id': pk, 'stock_quantity': stock_quantity, 'status': product_status}
+            for pk, (stock_quantity, product_status) in sorted(results.items())
+        ])
+    
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Change feed for keeping a copy of the catalog in sync
+        
+        Without `cursor` the feed starts with every product (a full sync).
+        Each page has up to `limit` changed products (oldest change first),
+        the ids of deleted products and the `cursor` for the next request;
+        keep requesting while `has_more` is true, then poll with the last
+        cursor. Answers 410 if the cursor is older than the kept deletions.
+        """
+        try:
+            limit = int(request.query_params.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            raise ValidationError({'limit': ['A valid integer is required.']})
+        if not 1 <= limit <= MAX_LIMIT:
+            raise ValidationError({'limit': [f'Must be between 1 and {MAX_LIMIT}.']})
+        
+        try:
+            page = changes_since(
+                request.query_params.get('cursor'), limit,
+                products=Product.objects.select_related('category', 'created_by'),
+            )
+        except InvalidCursor as exc:
+            raise ValidationError({'cursor': [str(exc)]})
+        except CursorExpired as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_410_GONE)
+        
+        return Response({
+            'changed': self.get_serializer(page['changed'], many=True).data,
+            'deleted': [
+                {'id': tombstone.product_id, 'deleted_at': tombstone.deleted_at}
+                for tombstone in page['deleted']
+            ],
+            'cursor': page['cursor'],
+            'has_more': page['has_more'],
+        })
+    
     @action(detail=False, methods=['get'])
+    @method_decorator(conditional(catalog_validators))
     def stats(self, request):
         """Get product statistics"""
-        products = Product.objects.all()
+        stats = get_product_stats()
         return Response({
-            'total_products': products.count(),
-            'in_stock': products.filter(status='in_stock').count(),
-            'low_stock': products.filter(status='low_stock').count(),
-            'out_of_stock': products.filter(status='out_of_stock').count(),
+            'total_products': stats['total_products'],
+            'in_stock': stats['in_stock'],
+            'low_stock': stats['low_stock'],
+            'out_of_stock': stats['out_of_stock'],
         })
 
 
+@method_decorator(conditional(category_validators), name='retrieve')
 class CategoryViewSet(viewsets.ModelViewSet):
     """
     API endpoint for Categories.
     
-    - GET /api/categories/ - List all categories
+    - GET /api/categories/ - List all categories (cursor paginated)
     - POST /api/categories/ - Create category (Admin only)
     - GET /api/categories/{id}/ - Retrieve category
     - PUT /api/categories/{id}/ - Update category (Admin only)
     - DELETE /api/categories/{id}/ - Delete category (Admin only)
     """
-    queryset = Category.objects.all().order_by('name')
+    queryset = Category.objects.annotate(product_count=Count('products')).order_by('name')
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
+    pagination_class = CategoryCursorPagination
+    
+    @method_decorator(conditional(catalog_validators))
+    def list(self, request, *args, **kwargs):
+        # product_count depends on the products as well
+        data = read_through(
+            'category_list', ('api', request.build_absolute_uri()),
+            lambda: super(CategoryViewSet, self).list(request, *args, **kwargs).data,
+            depends=('category', 'product'),
+        )
+        return Response(data)
+
+
+class ReportJobViewSet(mixins.CreateModelMixin,
+                       mixins.RetrieveModelMixin,
+                       mixins.ListModelMixin,
+                       viewsets.GenericViewSet):
+    """
+    API endpoint for background PDF reports.
+    
+    - POST /api/reports/ - Queue a products report; accepts the product list filters
+      (search, search_mode, category, status) and returns 202 with the job
+    - GET /api/reports/ - List your report jobs
+    - GET /api/reports/{id}/ - Job status
+    - GET /api/reports/{id}/download/ - Download the finished PDF
+    """
+    serializer_class = ReportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        return ReportJob.objects.filter(created_by=self.request.user)
+    
+    def create(self, request, *args, **kwargs):
+        try:
+            job = enqueue_report(request.user, request.data)
+        except InvalidFilters as exc:
+            raise ValidationError(exc.errors)
+        serializer = self.get_serializer(job)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Download the finished report PDF"""
+        job = get_object_or_404(self.get_queryset(), pk=pk, status='done')
+        filename = f"products_report_{job.created_at.strftime('%Y%m%d_%H%M%S')}.pdf"
+        return FileResponse(job.file.open('rb'), as_attachment=True, filename=filename, content_type='application/pdf')
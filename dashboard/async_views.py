@@ -0,0 +1,168 @@
+"""
+Async (ASGI) versions of the read-heavy views
+
+Served next to the sync views (/dashboard/async/ and /api/async/products/...).
+Under an ASGI server such as uvicorn they wait for the database and cache
+without holding a thread per request; the sync views keep serving WSGI.
+Both share the read cache, so either one warms it for the other.
+"""
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import render
+from rest_framework.exceptions import ValidationError
+
+from .caching import aread_through
+from .conditional import catalog_validators, conditional
+from .models import Category
+from .pagination import KeysetPaginator, ProductCursorPagination, estimate_count, querystring_without
+from .queries import InvalidFilters, ProductQuery
+from .serializers import ProductSerializer
+from .services import aget_product_stats
+
+
+def api_login_required(view):
+    """Answer 401 (like the DRF endpoints) instead of redirecting anonymous users"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        # Resolve the user now; the lazy request.user cannot query from async code
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def _page_size(request):
+    try:
+        size = int(request.GET.get(ProductCursorPagination.page_size_query_param, ProductCursorPagination.page_size))
+    except ValueError:
+        return ProductCursorPagination.page_size
+    return min(max(size, 1), ProductCursorPagination.max_page_size)
+
+
+def _page_url(request, cursor):
+    if cursor is None:
+        return None
+    return request.build_absolute_uri(f"{request.path}?{querystring_without(request, 'cursor')}cursor={cursor}")
+
+
+@api_login_required
+async def product_list_api(request):
+    """
+    GET /api/async/products/ - products with the same filters and `fields` as /api/products/
+
+    Pages are keyset pages like the dashboard's; follow the `next`/`previous` links.
+    """
+    try:
+        fields = ProductSerializer.parse_fields(request.GET.get('fields'))
+    except ValidationError as exc:
+        return JsonResponse(exc.detail, status=400)
+
+    def build():
+        # Form validation may load the category choices, and search checks for its index
+        query = ProductQuery.from_params(request.GET)
+        if fields is not None:
+            products = query.queryset(columns=ProductSerializer.columns_for(fields))
+        else:
+            products = query.queryset('api')
+        return products, query.ordering(products)
+
+    try:
+        products, ordering = await sync_to_async(build)()
+    except InvalidFilters as exc:
+        return JsonResponse(exc.errors, status=400)
+    paginator = KeysetPaginator(products, _page_size(request), ordering=ordering)
+
+    async def load():
+        page = await paginator.aget_page(request.GET.get('cursor'))
+        serializer = ProductSerializer(page.object_list, many=True, fields=fields, context={'request': request})
+        return {
+            'next': _page_url(request, page.next_cursor),
+            'previous': _page_url(request, page.previous_cursor),
+            'results': serializer.data,
+        }
+
+    data = await aread_through('product_list', ('async', request.build_absolute_uri()), load)
+    return JsonResponse(data)
+
+
+@api_login_required
+async def product_detail_api(request, pk):
+    """GET /api/async/products/{id}/ - same body as /api/products/{id}/"""
+    try:
+        fields = ProductSerializer.parse_fields(request.GET.get('fields'))
+    except ValidationError as exc:
+        return JsonResponse(exc.detail, status=400)
+
+    query = ProductQuery()
+    if fields is not None:
+        products = query.queryset(columns=ProductSerializer.columns_for(fields))
+    else:
+        products = query.queryset('api')
+
+    async def load():
+        product = await products.filter(pk=pk).afirst()
+        if product is None:
+            return None
+        return ProductSerializer(product, fields=fields, context={'request': request}).data
+
+    data = await aread_through('product_detail', ('async', request.build_absolute_uri()), load)
+    if data is None:
+        return JsonResponse({'detail': 'No Product matches the given query.'}, status=404)
+    return JsonResponse(data)
+
+
+@api_login_required
+async def product_stats_api(request):
+    """GET /api/async/products/stats/ - same body as /api/products/stats/"""
+    stats = await aget_product_stats()
+    return JsonResponse({
+        'total_products': stats['total_products'],
+        'in_stock': stats['in_stock'],
+        'low_stock': stats['low_stock'],
+        'out_of_stock': stats['out_of_stock'],
+    })
+
+
+@login_required
+@conditional(catalog_validators)
+async def dashboard_index(request):
+    """Dashboard home page, with the stats and both lists loaded concurrently"""
+    request.user = await request.auser()
+    products = ProductQuery().queryset('list')
+    categories = Category.objects.all().order_by('name')
+
+    products_paginator = KeysetPaginator(products, 5)
+    categories_paginator = KeysetPaginator(
+        categories, 5, ordering=('name', 'id'), count=sync_to_async(lambda: estimate_count(categories))
+    )
+    products_cursor = request.GET.get('products_cursor')
+    categories_cursor = request.GET.get('categories_cursor')
+
+    # Same cache keys as the sync dashboard
+    stats, products_page_obj, categories_page_obj = await asyncio.gather(
+        aget_product_stats(),
+        aread_through(
+            'product_list', ('dashboard', products_cursor),
+            lambda: products_paginator.aget_page(products_cursor),
+        ),
+        aread_through(
+            'category_list', ('dashboard', categories_cursor),
+            lambda: categories_paginator.aget_page(categories_cursor), depends=('category',),
+        ),
+    )
+    products_page_obj.count = stats['total_products']
+
+    context = {
+        'stats': stats,
+        'products': products_page_obj,
+        'categories': categories_page_obj,
+        'products_query': querystring_without(request, 'products_cursor'),
+        'categories_query': querystring_without(request, 'categories_cursor'),
+        'user': request.user,
+    }
+    return render(request, 'dashboard/dashboard.html', context)
@@ -0,0 +1,182 @@
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+
+from .models import Product
+from .serializers import ProductCreateSerializer
+
+
+# Items written per transaction
+BULK_BATCH_SIZE = 500
+
+
+def _batches(items, size=BULK_BATCH_SIZE):
+    """Group an iterable of items into lists of (index, item) pairs"""
+    batch = []
+    for index, item in enumerate(items):
+        batch.append((index, item))
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _error(index, errors):
+    if not isinstance(errors, dict):
+        errors = {'non_field_errors': [str(errors)]}
+    return {'index': index, 'status': 'error', 'errors': errors}
+
+
+def _as_pk(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _invalid(index, item):
+    """Per-item error for anything that is not a JSON object, or None"""
+    if isinstance(item, dict):
+        return None
+    if isinstance(item, ParseError):
+        return _error(index, item.detail)
+    return _error(index, 'Expected a JSON object.')
+
+
+def _write(pairs, write, status):
+    """Run `write` on the batch's objects in one transaction and report each item"""
+    if not pairs:
+        return []
+    try:
+        with transaction.atomic():
+            write([obj for index, obj in pairs])
+    except DatabaseError as exc:
+        return [_error(index, exc) for index, obj in pairs]
+    return [{'index': index, 'id': obj.pk, 'status': status} for index, obj in pairs]
+
+
+def bulk_create_products(items, user):
+    """
+    Create products in batched transactions
+
+    Args:
+        items: Iterable of product dicts (ProductCreateSerializer fields)
+        user: User recorded as the creator
+
+    Returns:
+        List of per-item results ({'index', 'id', 'status'} or {'index', 'status', 'errors'})
+    """
+    results = []
+    for batch in _batches(items):
+        pairs = []
+        batch_results = []
+        for index, item in batch:
+            error = _invalid(index, item)
+            if error:
+                batch_results.append(error)
+                continue
+            # CategoryField resolves categories from the cached names: no query per item
+            serializer = ProductCreateSerializer(data=item)
+            if not serializer.is_valid():
+                batch_results.append(_error(index, serializer.errors))
+                continue
+            pairs.append((index, Product(created_by=user, **serializer.validated_data)))
+
+        # Status is derived from stock by ProductQuerySet.bulk_create()
+        batch_results.extend(_write(pairs, Product.objects.bulk_create, 'created'))
+        results.extend(sorted(batch_results, key=lambda result: result['index']))
+    return results
+
+
+def bulk_update_products(items):
+    """
+    Partially update products in batched transactions
+
+    Args:
+        items: Iterable of dicts with an `id` plus the fields to change
+
+    Returns:
+        List of per-item results, as for bulk_create_products
+    """
+    results = []
+    for batch in _batches(items):
+        ids = {_as_pk(item.get('id')) for index, item in batch if isinstance(item, dict)}
+        ids.discard(None)
+        with transaction.atomic():
+            # Locked until the batch is written, so concurrent stock adjustments are not undone
+            products = Product.objects.select_for_update().in_bulk(ids)
+            now = timezone.now()
+            pairs = []
+            changed = {}
+            batch_results = []
+            for index, item in batch:
+                error = _invalid(index, item)
+                if error:
+                    batch_results.append(error)
+                    continue
+                product = products.get(_as_pk(item.get('id')))
+                if product is None:
+                    batch_results.append(_error(index, {'id': ['Product not found.']}))
+                    continue
+                serializer = ProductCreateSerializer(product, data=item, partial=True)
+                if not serializer.is_valid():
+                    batch_results.append(_error(index, serializer.errors))
+                    continue
+                for attr, value in serializer.validated_data.items():
+                    setattr(product, attr, value)
+                # bulk_update() does not apply auto_now
+                product.updated_at = now
+                changed.setdefault(product.pk, {'updated_at'}).update(serializer.validated_data)
+                pairs.append((index, product))
+
+            def write(objs):
+                # Each product only writes the fields its own items changed; status
+                # follows stock_quantity, see ProductQuerySet.bulk_update()
+                groups = {}
+                for obj in {obj.pk: obj for obj in objs}.values():
+                    groups.setdefault(frozenset(changed[obj.pk]), []).append(obj)
+                for fields, objs in groups.items():
+                    Product.objects.bulk_update(objs, sorted(fields))
+
+            batch_results.extend(_write(pairs, write, 'updated'))
+        results.extend(sorted(batch_results, key=lambda result: result['index']))
+    return results
+
+
+def bulk_delete_products(items):
+    """
+    Delete products in batched transactions
+
+    Args:
+        items: Iterable of product ids, or dicts with an `id`
+
+    Returns:
+        List of per-item results, as for bulk_create_products
+    """
+    results = []
+    for batch in _batches(items):
+        ids = {}
+        batch_results = []
+        for index, item in batch:
+            pk = _as_pk(item.get('id') if isinstance(item, dict) else item)
+            if pk is None:
+                batch_results.append(_error(index, 'Expected a product id.'))
+            else:
+                ids[index] = pk
+        existing = set(Product.objects.filter(pk__in=ids.values()).values_list('pk', flat=True))
+
+        pairs = []
+        for index, pk in ids.items():
+            if pk in existing:
+                pairs.append((index, Product(pk=pk)))
+            else:
+                batch_results.append(_error(index, {'id': ['Product not found.']}))
+
+        def write(objs):
+            # One rollup update and one tombstone INSERT per batch, see ProductQuerySet.delete()
+            Product.objects.filter(pk__in=[obj.pk for obj in objs]).delete()
+
+        batch_results.extend(_write(pairs, write, 'deleted'))
+        results.extend(sorted(batch_results, key=lambda result: result['index']))
+    return results
@@ -0,0 +1,202 @@
+"""
+Read-through cache for product and category reads
+
+Cached values are keyed by a name, the request's parameters and the
+current version of every model the value depends on. Writes never delete
+cache entries: they bump the model's version counter, so every key built
+from the old version simply stops being read and expires on its own.
+Version counters live in the same cache (default backend: local memory,
+file or Redis, see CACHE_BACKEND in settings).
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+VERSION_KEY = 'dashboard:version:{}'
+MODIFIED_KEY = 'dashboard:modified:{}'
+HITS_KEY = 'dashboard:cache:{}:hits'
+MISSES_KEY = 'dashboard:cache:{}:misses'
+
+# Names passed to read_through(), reported by cache_stats()
+CACHED_READS = ('product_detail', 'product_list', 'category_list', 'category_choices', 'stats', 'validators')
+
+_MISSING = object()
+
+
+def count(key):
+    """Increment a counter stored in the cache"""
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def _initial_version():
+    # A counter evicted from the cache restarts from the clock, never from an old value
+    return time.time_ns() // 1000
+
+
+def versions(*models):
+    """Current version counters of the given model names ('product', 'category')"""
+    keys = [VERSION_KEY.format(model) for model in models]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _initial_version(), timeout=None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def bump(*models):
+    """Invalidate every cached value depending on the given model names"""
+    now = time.time()
+    for model in models:
+        key = VERSION_KEY.format(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), timeout=None)
+        cache.set(MODIFIED_KEY.format(model), now, timeout=None)
+
+
+def last_modified(*models):
+    """
+    Time (epoch seconds) of the latest write to any of the given model names
+
+    Recorded by bump(), so it covers deletions and rows leaving a filter.
+    A time that is not known (evicted, or the cache is disabled) counts as
+    now: a too recent Last-Modified only costs a full response.
+    """
+    keys = [MODIFIED_KEY.format(model) for model in models]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time(), timeout=None)
+            found[key] = cache.get(key) or time.time()
+    return max(found.values())
+
+
+def bump_on_commit(*models):
+    """
+    bump() once the current transaction commits (immediately outside one)
+
+    Bumping before the commit would let a concurrent reader cache the old
+    rows under the new version.
+    """
+    transaction.on_commit(lambda: bump(*models))
+
+
+def _key(name, key_parts, current_versions):
+    version = '.'.join(str(value) for value in current_versions)
+    digest = hashlib.sha256(repr(key_parts).encode()).hexdigest()
+    return f'dashboard:{name}:{version}:{digest}'
+
+
+def read_through(name, key_parts, compute, depends=('product',), timeout=None):
+    """
+    Return a cached value, computing and storing it on a miss
+
+    Args:
+        name: Name of the cached read (one of CACHED_READS)
+        key_parts: Anything with a stable repr identifying the value
+            (e.g. the primary key, or the request URL with its filters,
+            sort and cursor)
+        compute: Callable returning the (picklable) value
+        depends: Model names whose changes invalidate the value
+        timeout: Seconds to keep the value (default: settings.CACHE_TIMEOUT)
+
+    Returns:
+        The cached or freshly computed value
+
+    Values computed inside a transaction are not stored: the transaction
+    may still roll back, and its own writes only bump the versions once
+    it commits.
+    """
+    key = _key(name, key_parts, versions(*depends))
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        count(HITS_KEY.format(name))
+        return value
+
+    count(MISSES_KEY.format(name))
+    value = compute()
+    if not in_transaction():
+        if timeout is None:
+            timeout = getattr(settings, 'CACHE_TIMEOUT', 300)
+        cache.set(key, value, timeout)
+    return value
+
+
+def in_transaction():
+    """Whether the current thread is inside an atomic block of the default database"""
+    return transaction.get_connection().in_atomic_block
+
+
+async def acount(key):
+    """count() for async views"""
+    await cache.aadd(key, 0, timeout=None)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aset(key, 1, timeout=None)
+
+
+async def aversions(*models):
+    """versions() for async views"""
+    keys = [VERSION_KEY.format(model) for model in models]
+    found = await cache.aget_many(keys)
+    for key in keys:
+        if key not in found:
+            await cache.aadd(key, _initial_version(), timeout=None)
+            found[key] = await cache.aget(key)
+    return [found[key] for key in keys]
+
+
+async def aread_through(name, key_parts, compute, depends=('product',), timeout=None):
+    """
+    read_through() for async views; `compute` returns an awaitable
+
+    Async code cannot hold a transaction open, so the value is always stored.
+    """
+    key = _key(name, key_parts, await aversions(*depends))
+    value = await cache.aget(key, _MISSING)
+    if value is not _MISSING:
+        await acount(HITS_KEY.format(name))
+        return value
+
+    await acount(MISSES_KEY.format(name))
+    value = await compute()
+    if timeout is None:
+        timeout = getattr(settings, 'CACHE_TIMEOUT', 300)
+    await cache.aset(key, value, timeout)
+    return value
+
+
+def cache_stats():
+    """Hit/miss counters and hit ratio of every cached read, plus the totals"""
+    keys = [key.format(name) for name in CACHED_READS for key in (HITS_KEY, MISSES_KEY)]
+    counters = cache.get_many(keys)
+    stats = {}
+    total_hits = total_misses = 0
+    for name in CACHED_READS:
+        hits = counters.get(HITS_KEY.format(name), 0)
+        misses = counters.get(MISSES_KEY.format(name), 0)
+        total_hits += hits
+        total_misses += misses
+        stats[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+    stats['total'] = {
+        'hits': total_hits,
+        'misses': total_misses,
+        'hit_ratio': round(total_hits / (total_hits + total_misses), 4) if total_hits + total_misses else None,
+    }
+    stats['backend'] = settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1]
+    return stats
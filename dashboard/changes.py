@@ -0,0 +1,133 @@
+import base64
+import binascii
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Product, ProductTombstone
+
+
+# Rows newer than this are held back: a transaction that commits late can
+# still write an updated_at/deleted_at just behind a cursor handed out earlier
+DEFAULT_SETTLE_SECONDS = 5
+DEFAULT_TOMBSTONE_RETENTION_DAYS = 30
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+class InvalidCursor(ValueError):
+    """The change feed cursor cannot be decoded"""
+
+
+class CursorExpired(Exception):
+    """The cursor is older than the kept tombstones; the client has to resync"""
+
+
+def tombstone_cutoff():
+    """Tombstones older than this are pruned, so cursors before it are no longer complete"""
+    days = getattr(settings, 'PRODUCT_TOMBSTONE_RETENTION_DAYS', DEFAULT_TOMBSTONE_RETENTION_DAYS)
+    return timezone.now() - timedelta(days=days)
+
+
+def encode_cursor(position):
+    """Opaque cursor for a {'products': (updated_at, id), 'deleted': (deleted_at, id)} position"""
+    payload = {
+        key: [value[0].isoformat(), value[1]] if value else None
+        for key, value in position.items()
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return {'products': None, 'deleted': None}
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        position = {}
+        for key in ('products', 'deleted'):
+            value = payload[key]
+            if value is None:
+                position[key] = None
+                continue
+            moment = parse_datetime(value[0])
+            if moment is None or not isinstance(value[1], int):
+                raise ValueError(cursor)
+            position[key] = (moment, value[1])
+    except (binascii.Error, ValueError, KeyError, TypeError, IndexError, UnicodeDecodeError):
+        raise InvalidCursor('Invalid cursor.')
+    return position
+
+
+def _after(queryset, field, position, until, limit):
+    """Rows of `queryset` after the (timestamp, id) position in keyset order, up to `until`"""
+    rows = queryset.filter(**{f'{field}__lt': until})
+    if position is not None:
+        moment, pk = position
+        rows = rows.filter(Q(**{f'{field}__gt': moment}) | Q(**{field: moment, 'id__gt': pk}))
+    rows = list(rows.order_by(field, 'id')[:limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def changes_since(cursor=None, limit=DEFAULT_LIMIT, products=None):
+    """
+    Products changed and deleted after a change feed cursor
+
+    Without a cursor the feed starts from the beginning (a full sync). Each
+    page holds up to `limit` changed products, oldest change first, and up
+    to `limit` deletions; the returned cursor continues after both.
+
+    Args:
+        cursor: Cursor from a previous page, or None
+        limit: Maximum products (and deletions) per page
+        products: Product queryset to read changes from (e.g. with related
+            rows selected); defaults to every product
+
+    Returns:
+        Dict with changed (Product list), deleted (ProductTombstone list),
+        cursor and has_more
+
+    Raises:
+        InvalidCursor: the cursor cannot be decoded
+        CursorExpired: deletions after the cursor may already be pruned
+    """
+    position = decode_cursor(cursor)
+    if cursor and (position['deleted'] is None or position['deleted'][0] < tombstone_cutoff()):
+        raise CursorExpired('The cursor is too old; sync again without a cursor.')
+
+    settle = getattr(settings, 'CHANGES_SETTLE_SECONDS', DEFAULT_SETTLE_SECONDS)
+    until = timezone.now() - timedelta(seconds=settle)
+    if products is None:
+        products = Product.objects.all()
+
+    changed, more_changed = _after(products, 'updated_at', position['products'], until, limit)
+    # A full sync only needs the products that exist now
+    if cursor:
+        deleted, more_deleted = _after(
+            ProductTombstone.objects.all(), 'deleted_at', position['deleted'], until, limit
+        )
+    else:
+        deleted, more_deleted = [], False
+
+    if changed:
+        position['products'] = (changed[-1].updated_at, changed[-1].pk)
+    if more_deleted:
+        position['deleted'] = (deleted[-1].deleted_at, deleted[-1].pk)
+    else:
+        # Every deletion before `until` has been seen; moving up keeps quiet feeds from expiring
+        position['deleted'] = (until, 0)
+    return {
+        'changed': changed,
+        'deleted': deleted,
+        'cursor': encode_cursor(position),
+        'has_more': more_changed or more_deleted,
+    }
+
+
+def prune_tombstones():
+    """Delete tombstones past the retention period; returns how many were deleted"""
+    deleted, _ = ProductTombstone.objects.filter(deleted_at__lt=tombstone_cutoff()).delete()
+    return deleted
@@ -0,0 +1,50 @@
+"""
+Cached category choices for forms and serializers
+
+Category selects render and validate from one cached {id: name} mapping
+(invalidated through the 'category' version in dashboard.caching) instead
+of querying the category table on every request.
+"""
+from . import caching
+from .models import Category
+
+
+# Process-local copy of the mapping for the current category version, so
+# large category tables are not unpickled from the cache on every request
+_local = {'version': None, 'names': {}}
+
+
+def category_names():
+    """Every category as an {id: name} dict, ordered by name"""
+    version = caching.versions('category')[0]
+    if version is None or _local['version'] != version:
+        names = caching.read_through(
+            'category_choices', 'all',
+            lambda: dict(Category.objects.order_by('name', 'id').values_list('id', 'name')),
+            depends=('category',),
+        )
+        # Not kept without a version to check it against (dummy cache), or
+        # when read inside a transaction that may still roll back
+        if version is None or caching.in_transaction():
+            return names
+        _local.update(version=version, names=names)
+    return _local['names']
+
+
+def category_choices(empty_label=None):
+    """(id, name) choices for a select, preceded by ('', empty_label) if given"""
+    choices = [('', empty_label)] if empty_label is not None else []
+    choices.extend(category_names().items())
+    return choices
+
+
+def get_category(pk):
+    """
+    Return the category with this primary key from the cached mapping, or None
+
+    The instance only has id and name loaded; other fields are fetched on access.
+    """
+    name = category_names().get(pk)
+    if name is None:
+        return None
+    return Category.from_db(Category.objects.db, ['id', 'name'], (pk, name))
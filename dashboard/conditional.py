@@ -0,0 +1,181 @@
+"""
+Conditional GET (ETag / Last-Modified) for product and category reads
+
+Views are validated from a fingerprint of the data they show: the row
+count and latest updated_at of each queryset, computed with one aggregate
+and kept in the read cache until the next product or category write. A
+matching If-None-Match or If-Modified-Since is answered with 304 before
+the view runs, so nothing is serialized or rendered.
+
+Last-Modified is the time of the latest product or category write of any
+kind (dashboard.caching.last_modified), not the newest updated_at shown:
+deleting a row or moving it out of a filter changes no shown updated_at.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .caching import last_modified, read_through
+from .models import Category, Product
+from .queries import InvalidFilters, ProductQuery
+
+
+def fingerprint(*querysets):
+    """
+    Validator token for the rows of the given querysets: a string that
+    changes whenever a row is added, removed or updated
+    """
+    parts = []
+    for queryset in querysets:
+        queryset = queryset.order_by()
+        found = read_through(
+            'validators', str(queryset.query),
+            lambda: queryset.aggregate(count=Count('pk'), last_modified=Max('updated_at')),
+            depends=('product', 'category'),
+        )
+        latest = found['last_modified']
+        parts.append(f"{found['count']}@{latest.isoformat() if latest else ''}")
+    return '|'.join(parts)
+
+
+def _rows(model, pk):
+    """Queryset of the `model` row with primary key `pk`, or None if `pk` is not a valid key"""
+    try:
+        return model.objects.filter(pk=pk)
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+
+def product_validators(request, pk, **kwargs):
+    """A product's row, plus the categories (the category name is shown with it)"""
+    product = _rows(Product, pk)
+    if product is None:
+        # Let the view answer 404
+        return None
+    token = fingerprint(product, Category.objects.all())
+    if token.startswith('0@'):
+        # Let the view answer 404
+        return None
+    return token
+
+
+def product_list_validators(request, *args, **kwargs):
+    """Every product matching the request's filters, plus the categories"""
+    try:
+        products = ProductQuery.from_params(request.GET).queryset('list')
+    except InvalidFilters:
+        # The API answers 400; the HTML list ignores the invalid filters
+        return None
+    return fingerprint(products, Category.objects.all())
+
+
+def catalog_validators(request, *args, **kwargs):
+    """Every product and category (dashboard, stats and category lists with product counts)"""
+    return fingerprint(Product.objects.all(), Category.objects.all())
+
+
+def category_validators(request, pk, **kwargs):
+    """A category's row, plus the products (for its product count)"""
+    category = _rows(Category, pk)
+    if category is None:
+        return None
+    token = fingerprint(category, Product.objects.all())
+    if token.startswith('0@'):
+        return None
+    return token
+
+
+def _etag(request, token):
+    """
+    Strong ETag for one representation of the data identified by `token`
+
+    The same data renders differently per URL (cursor, fields, page size),
+    format, user and CSRF token, so those are part of the tag.
+    """
+    user = getattr(request, 'user', None)
+    variant = '\n'.join([
+        token,
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+        str(getattr(user, 'pk', '')),
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+    ])
+    return quote_etag(hashlib.sha256(variant.encode()).hexdigest())
+
+
+def _validate(validators, request, *args, **kwargs):
+    """(etag, last-modified timestamp or None) for a request, or None to leave it to the view"""
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    # Pending flash messages are only shown by a full render
+    if len(messages.get_messages(request)):
+        return None
+    token = validators(request, *args, **kwargs)
+    if token is None:
+        return None
+
+    timestamp = int(last_modified('product', 'category'))
+    if timestamp >= int(time.time()):
+        # HTTP dates have whole seconds: a write later in this second would not move it
+        timestamp = None
+    return _etag(request, token), timestamp
+
+
+def _finish(response, etag, timestamp):
+    if response.status_code in (200, 304):
+        response.headers.setdefault('ETag', etag)
+        if timestamp is not None:
+            response.headers.setdefault('Last-Modified', http_date(timestamp))
+        # Always revalidate; the user's data must not be shared by caches
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Accept', 'Cookie'))
+    return response
+
+
+def conditional(validators):
+    """
+    View decorator adding ETag/Last-Modified and answering 304s
+
+    Args:
+        validators: Callable taking the view's arguments and returning a
+            token built by fingerprint(), or None to skip conditional
+            handling (e.g. the object does not exist)
+
+    Works on function views (below login_required), async views (the
+    validators then run in a worker thread) and, through method_decorator,
+    on DRF viewset actions after permission checks.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                found = await sync_to_async(_validate)(validators, request, *args, **kwargs)
+                if found is None:
+                    return await view(request, *args, **kwargs)
+                etag, timestamp = found
+                response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                return _finish(response, etag, timestamp)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            found = _validate(validators, request, *args, **kwargs)
+            if found is None:
+                return view(request, *args, **kwargs)
+            etag, timestamp = found
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return _finish(response, etag, timestamp)
+        return wrapper
+    return decorator
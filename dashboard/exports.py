@@ -0,0 +1,110 @@
+import csv
+import io
+import tempfile
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+# Rows fetched per round-trip of the server-side cursor
+EXPORT_CHUNK_SIZE = 5000
+# Rows written per chunk handed to the response
+EXPORT_ROWS_PER_WRITE = 1000
+# XLSX files larger than this are spooled to a temporary file instead of memory
+XLSX_SPOOL_MAX_SIZE = 10 * 1024 * 1024
+
+# (column header, queryset field) pairs, in export order
+EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('name', 'name'),
+    ('category', 'category__name'),
+    ('price', 'price'),
+    ('status', 'status'),
+    ('stock_quantity', 'stock_quantity'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+)
+EXPORT_HEADERS = [header for header, field in EXPORT_COLUMNS]
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+
+
+def export_rows(products):
+    """
+    Yield one tuple of EXPORT_COLUMNS values per product
+
+    Only the exported columns are selected and no model instances are
+    built; on PostgreSQL the rows come from a server-side cursor, so the
+    whole result set is never held in memory.
+    """
+    if not products.query.order_by:
+        products = products.order_by('-created_at', '-id')
+    fields = [field for header, field in EXPORT_COLUMNS]
+    return products.values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def _batched(rows, size=EXPORT_ROWS_PER_WRITE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def stream_csv(products):
+    """Yield the products as CSV text, a batch of rows at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADERS)
+    for batch in _batched(export_rows(products)):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_ndjson(products):
+    """Yield the products as newline-delimited JSON, one object per line"""
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for batch in _batched(export_rows(products)):
+        yield ''.join(
+            encoder.encode(dict(zip(EXPORT_HEADERS, row))) + '\n'
+            for row in batch
+        )
+
+
+def build_xlsx(products):
+    """
+    Write the products to an XLSX workbook
+
+    XLSX is a zip archive and cannot be produced incrementally, so rows go
+    through openpyxl's write-only mode (constant memory) and the finished
+    file is spooled to disk.
+
+    Returns:
+        Spooled temporary file containing the workbook, positioned at the start
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Products')
+    sheet.append(EXPORT_HEADERS)
+    for row in export_rows(products):
+        # Excel has no timezone support
+        sheet.append([
+            value.replace(tzinfo=None) if hasattr(value, 'tzinfo') else value
+            for value in row
+        ])
+
+    buffer = tempfile.SpooledTemporaryFile(max_size=XLSX_SPOOL_MAX_SIZE)
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
@@ -1,9 +1,55 @@
+from functools import partial
+
 from django import forms
 
+from .choices import category_choices, get_category
 from .models import Product, Category
+from .search import SEARCH_MODE_CHOICES
+
+
+class CategoryChoiceField(forms.ChoiceField):
+    """
+    Category select backed by the cached category names
+
+    Renders and validates without querying the category table; the cleaned
+    value is a Category instance (or None).
+    """
+
+    def __init__(self, *, empty_label="---------", **kwargs):
+        super().__init__(choices=partial(category_choices, empty_label), **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            category = get_category(int(value))
+        except (TypeError, ValueError):
+            category = None
+        if category is None:
+            raise forms.ValidationError(
+                self.error_messages["invalid_choice"], code="invalid_choice", params={"value": value}
+            )
+        return category
+
+    def validate(self, value):
+        # to_python() already checked the id against the cached ones
+        forms.Field.validate(self, value)
+
+    def has_changed(self, initial, data):
+        initial = getattr(initial, "pk", initial)
+        return str(initial or "") != str(data or "")
 
 
 class ProductForm(forms.ModelForm):
+    category = CategoryChoiceField(
+        required=False,
+        widget=forms.Select(
+            attrs={
+                "class": "w-full px-4 py-2 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-transparent"
+            }
+        ),
+    )
+
     class Meta:
         model = Product
         fields = [
@@ -38,11 +84,6 @@ class ProductForm(forms.ModelForm):
                     "placeholder": "0.00",
                 }
             ),
-            "category": forms.Select(
-                attrs={
-                    "class": "w-full px-4 py-2 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-transparent"
-                }
-            ),
             "stock_quantity": forms.NumberInput(
                 attrs={
                     "class": "w-full px-4 py-2 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-transparent",
@@ -97,8 +138,7 @@ class ProductSearchForm(forms.Form):
         ),
     )
 
-    category = forms.ModelChoiceField(
-        queryset=Category.objects.all(),
+    category = CategoryChoiceField(
         required=False,
         empty_label="All Categories",
         widget=forms.Select(
@@ -117,3 +157,13 @@ class ProductSearchForm(forms.Form):
             }
         ),
     )
+
+    search_mode = forms.ChoiceField(
+        required=False,
+        choices=SEARCH_MODE_CHOICES,
+        widget=forms.Select(
+            attrs={
+                "class": "w-full px-4 py-2 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-transparent"
+            }
+        ),
+    )
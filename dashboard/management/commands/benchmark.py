@@ -0,0 +1,208 @@
+import io
+import json
+import math
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import django
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from dashboard.models import Category, Product
+from dashboard.pagination import KeysetPaginator
+from dashboard.queries import ProductQuery
+
+
+BENCHMARK_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+# Cold runs compute every request: the read cache never hits
+NO_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the dashboard, product list, API and PDF endpoints at several data scales '
+        'and print latency percentiles, query counts and peak memory as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='1000,10000', help='Comma separated product counts (default: 1000,10000)')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per endpoint')
+        parser.add_argument('--pdf-iterations', type=int, default=3, help='Timed requests for the full PDF report')
+        parser.add_argument('--seed', type=int, default=42, help='Seed for generate_load_data')
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+        parser.add_argument('--compare', help='Previous results file; report p50 changes against it')
+        parser.add_argument('--threshold', type=float, default=1.25,
+                            help='With --compare, fail if any p50 grows by more than this factor')
+
+    def endpoints(self, product, category, deep_cursor):
+        """(name, url, iterations key) for every benchmarked request"""
+        return [
+            ('dashboard_index', '/dashboard/', 'iterations'),
+            ('product_list', '/dashboard/products/', 'iterations'),
+            ('product_list_search', '/dashboard/products/?search=steel+chair', 'iterations'),
+            ('product_list_filter', f'/dashboard/products/?category={category.pk}&status=low_stock', 'iterations'),
+            ('product_list_deep_page', f'/dashboard/products/?cursor={deep_cursor}', 'iterations'),
+            ('product_list_last_page', '/dashboard/products/?cursor=last', 'iterations'),
+            ('api_product_list', '/api/products/?page_size=50', 'iterations'),
+            ('api_product_search', '/api/products/?search=steel+chair&page_size=50', 'iterations'),
+            ('api_product_stats', '/api/products/stats/', 'iterations'),
+            ('export_products_pdf', '/dashboard/products/pdf/', 'pdf_iterations'),
+            ('export_product_pdf', f'/dashboard/products/{product.pk}/pdf/', 'iterations'),
+        ]
+
+    def request(self, client, url):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise CommandError(f'{url} returned {response.status_code}')
+        # Streamed bodies are part of the cost (the test client closes the response once consumed)
+        if response.streaming:
+            for chunk in response.streaming_content:
+                pass
+
+    def measure(self, client, url, iterations):
+        self.request(client, url)  # warm up caches and connections
+
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            self.request(client, url)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        # Seeding can fill the (bounded) debug query log, which would hide new entries
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.request(client, url)
+
+        # Separate run: tracing allocations slows the request down
+        tracemalloc.start()
+        self.request(client, url)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        return {
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p90_ms': round(percentile(timings, 90), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'mean_ms': round(statistics.fmean(timings), 2),
+            'max_ms': round(max(timings), 2),
+            'queries': len(queries),
+            'peak_kb': round(peak / 1024),
+        }
+
+    def run_scale(self, scale, options):
+        """Seed exactly `scale` products into the emptied benchmark database and benchmark every endpoint"""
+        call_command('flush', interactive=False, verbosity=0)
+        cache.clear()
+        call_command(
+            'generate_load_data', products=scale, categories=max(scale // 500, 5), users=5,
+            seed=options['seed'], stdout=io.StringIO(),
+        )
+        product = Product.objects.order_by('pk').first()
+        user = product.created_by
+        user.is_staff = True
+        user.save(update_fields=['is_staff'])
+        category = Category.objects.filter(pk=product.category_id).first() or Category.objects.first()
+
+        # A cursor half way through the product list
+        middle = ProductQuery().queryset('list')[scale // 2]
+        deep_cursor = KeysetPaginator(Product.objects.all(), 10).cursor_after(middle)
+
+        client = Client()
+        client.force_login(user)
+        results = []
+        for name, url, iterations in self.endpoints(product, category, deep_cursor):
+            for mode, caches in (('cold', NO_CACHES), ('warm', BENCHMARK_CACHES)):
+                with override_settings(CACHES=caches):
+                    result = {'scale': scale, 'name': name, 'cache': mode, 'url': url}
+                    result.update(self.measure(client, url, options[iterations]))
+                results.append(result)
+                self.stderr.write(f"{scale:>8} {name:<24} {mode:<4} p50 {result['p50_ms']:>9} ms  "
+                                  f"{result['queries']:>3} queries  {result['peak_kb']:>7} KB")
+        return results
+
+    def compare(self, results, path, threshold):
+        with open(path) as f:
+            # Reports from before the cold/warm split were measured with the cache on
+            baseline = {
+                (row['scale'], row['name'], row.get('cache', 'warm')): row for row in json.load(f)['results']
+            }
+        regressions = []
+        for row in results:
+            before = baseline.get((row['scale'], row['name'], row['cache']))
+            if not before or not before['p50_ms']:
+                continue
+            ratio = row['p50_ms'] / before['p50_ms']
+            line = (f"{row['scale']:>8} {row['name']:<24} {row['cache']:<4} p50 {before['p50_ms']} -> {row['p50_ms']} ms "
+                    f"(x{ratio:.2f}), queries {before['queries']} -> {row['queries']}")
+            if ratio > threshold or row['queries'] > before['queries']:
+                regressions.append(line)
+                self.stderr.write(self.style.ERROR(f'REGRESSION {line}'))
+            else:
+                self.stderr.write(f'OK         {line}')
+        return regressions
+
+    def handle(self, *args, **options):
+        scales = [int(value) for value in options['scales'].split(',') if value]
+        if not scales or min(scales) < 2 or options['iterations'] < 1 or options['pdf_iterations'] < 1:
+            raise CommandError('Scales must be at least 2 and iteration counts positive')
+
+        setup_test_environment()
+        # A throwaway test database, so a scale is exactly that many products, and a
+        # private cache, so nothing computed from the seeded rows outlives the run
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        results = []
+        try:
+            with tempfile.TemporaryDirectory() as pdf_cache_dir, \
+                    override_settings(PDF_CACHE_DIR=pdf_cache_dir, CACHES=BENCHMARK_CACHES):
+                for scale in scales:
+                    results.extend(self.run_scale(scale, options))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'revision': git_revision(),
+                'timestamp': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'iterations': options['iterations'],
+                'pdf_iterations': options['pdf_iterations'],
+            },
+            'results': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            regressions = self.compare(results, options['compare'], options['threshold'])
+            if regressions:
+                raise CommandError(f'{len(regressions)} benchmark(s) regressed')
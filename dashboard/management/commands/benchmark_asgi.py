@@ -0,0 +1,210 @@
+import http.client
+import importlib.util
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from dashboard.management.commands.benchmark import git_revision, percentile
+from dashboard.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare request concurrency per worker: the sync views on a single-worker WSGI server '
+        '(gunicorn) against the async views on a single-worker ASGI server (uvicorn), using the '
+        'data already in the database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', default='1,8,32', help='Comma separated concurrent client counts')
+        parser.add_argument('--requests', type=int, default=400, help='Requests per endpoint and concurrency level')
+        parser.add_argument('--user', help='Username to send the requests as (default: the first superuser)')
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8101, help='Port for the servers (started one at a time)')
+        parser.add_argument('--wsgi-threads', type=int, default=1, help='Threads of the gunicorn worker')
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+
+    def endpoints(self, product_pk):
+        """(name, sync path, async path)"""
+        return [
+            ('product_list', '/api/products/?page_size=20', '/api/async/products/?page_size=20'),
+            ('product_detail', f'/api/products/{product_pk}/', f'/api/async/products/{product_pk}/'),
+            ('product_stats', '/api/products/stats/', '/api/async/products/stats/'),
+            ('dashboard', '/dashboard/', '/dashboard/async/'),
+        ]
+
+    def servers(self, options):
+        """(name, command line, which view flavour it serves)"""
+        bind = f"{options['host']}:{options['port']}"
+        return [
+            ('wsgi', [
+                sys.executable, '-m', 'gunicorn', 'products.wsgi:application', '--workers', '1',
+                '--threads', str(options['wsgi_threads']), '--bind', bind, '--log-level', 'warning',
+            ], 'sync'),
+            # The sync views under ASGI run on one thread, showing the cost of not porting them
+            ('asgi_sync_views', self.uvicorn(options), 'sync'),
+            ('asgi', self.uvicorn(options), 'async'),
+        ]
+
+    def uvicorn(self, options):
+        return [
+            sys.executable, '-m', 'uvicorn', 'products.asgi:application', '--workers', '1',
+            '--host', options['host'], '--port', str(options['port']), '--no-access-log', '--log-level', 'warning',
+        ]
+
+    def login_cookie(self, user):
+        """Session cookie for `user`, as Client.force_login() would create it"""
+        engine = import_module(settings.SESSION_ENGINE)
+        session = engine.SessionStore()
+        session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        return session, f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+    def start(self, command, options):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+        process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f'{command[2]} exited with code {process.returncode}')
+            try:
+                socket.create_connection((options['host'], options['port']), timeout=0.5).close()
+                return process
+            except OSError:
+                time.sleep(0.2)
+        process.kill()
+        raise CommandError(f'{command[2]} did not start listening within 30s')
+
+    def stop(self, process):
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    def load(self, path, concurrency, total, cookie, options):
+        """Send `total` requests from `concurrency` keep-alive clients; returns latencies (ms), errors, wall time"""
+        latencies = []
+        errors = []
+        remaining = [total]
+        lock = threading.Lock()
+
+        def client():
+            connection = http.client.HTTPConnection(options['host'], options['port'], timeout=60)
+            while True:
+                with lock:
+                    if not remaining[0]:
+                        break
+                    remaining[0] -= 1
+                start = time.perf_counter()
+                try:
+                    connection.request('GET', path, headers={'Cookie': cookie})
+                    response = connection.getresponse()
+                    response.read()
+                    status = response.status
+                except (OSError, http.client.HTTPException) as exc:
+                    connection.close()
+                    status = type(exc).__name__
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    if status == 200:
+                        latencies.append(elapsed)
+                    else:
+                        errors.append(status)
+            connection.close()
+
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, errors, time.perf_counter() - started
+
+    def handle(self, *args, **options):
+        levels = [int(value) for value in options['concurrency'].split(',') if value]
+        if not levels or min(levels) < 1 or options['requests'] < 1:
+            raise CommandError('Concurrency levels and --requests must be positive')
+        for module in ('uvicorn', 'gunicorn'):
+            if importlib.util.find_spec(module) is None:
+                raise CommandError(f'{module} is not installed (pip install -r requirements.txt)')
+
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+        else:
+            user = User.objects.filter(is_superuser=True).order_by('pk').first()
+        if user is None:
+            raise CommandError('No such user; pass --user')
+        product = Product.objects.order_by('pk').first()
+        if product is None:
+            raise CommandError('No products; run generate_load_data first')
+
+        session, cookie = self.login_cookie(user)
+        results = []
+        try:
+            for server, command, flavour in self.servers(options):
+                process = self.start(command, options)
+                try:
+                    for name, sync_path, async_path in self.endpoints(product.pk):
+                        path = async_path if flavour == 'async' else sync_path
+                        self.load(path, 1, 5, cookie, options)  # warm up caches and connections
+                        baseline = None
+                        for concurrency in levels:
+                            latencies, errors, wall = self.load(path, concurrency, options['requests'], cookie, options)
+                            result = {
+                                'server': server,
+                                'name': name,
+                                'path': path,
+                                'concurrency': concurrency,
+                                'requests_per_sec': round(len(latencies) / wall, 1),
+                                'p50_ms': round(percentile(latencies, 50), 2) if latencies else None,
+                                'p99_ms': round(percentile(latencies, 99), 2) if latencies else None,
+                                'mean_ms': round(statistics.fmean(latencies), 2) if latencies else None,
+                                'errors': len(errors),
+                            }
+                            # Throughput relative to the lowest concurrency: how much of
+                            # the added concurrency the single worker turns into throughput
+                            baseline = baseline or result['requests_per_sec']
+                            result['scaling'] = round(result['requests_per_sec'] / baseline, 2) if baseline else None
+                            results.append(result)
+                            self.stderr.write(
+                                f"{server:<16} {name:<15} c={concurrency:<4} {result['requests_per_sec']:>8} req/s  "
+                                f"x{result['scaling']}  p50 {result['p50_ms']} ms  "
+                                f"p99 {result['p99_ms']} ms  errors {result['errors']}"
+                            )
+                finally:
+                    self.stop(process)
+        finally:
+            session.delete()
+
+        report = {
+            'meta': {
+                'revision': git_revision(),
+                'timestamp': timezone.now().isoformat(),
+                'products': Product.objects.count(),
+                'requests': options['requests'],
+                'wsgi_threads': options['wsgi_threads'],
+                'cache_backend': settings.CACHES['default']['BACKEND'],
+            },
+            'results': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,98 @@
+import json
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
+from dashboard.pdf_parts import (
+    FlowableStream,
+    PRODUCT_TABLE_COL_WIDTHS,
+    PRODUCT_TABLE_HEADERS,
+    product_table,
+)
+from dashboard.utils import PDF_ROWS_PER_TABLE
+
+
+def legacy_table(rows):
+    """The original report table: one table, one setStyle() call per row"""
+    data = [PRODUCT_TABLE_HEADERS] + rows
+    table = Table(data, colWidths=PRODUCT_TABLE_COL_WIDTHS)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4F46E5')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F9FAFB')),
+        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#E5E7EB')),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 10),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ]))
+    for i in range(1, len(data)):
+        bc = colors.HexColor('#FFFFFF') if i % 2 == 0 else colors.HexColor('#F9FAFB')
+        table.setStyle(TableStyle([('BACKGROUND', (0, i), (-1, i), bc)]))
+    return [table]
+
+
+def current_tables(rows):
+    """The current report layout: page-sized tables sharing one TableStyle"""
+    for start in range(0, len(rows), PDF_ROWS_PER_TABLE):
+        yield product_table(rows[start:start + PDF_ROWS_PER_TABLE])
+
+
+class Command(BaseCommand):
+    help = 'Compare PDF report render time with per-row table styles versus a single shared TableStyle'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            default='1000,10000,50000',
+            help='Comma separated row counts to render (default: 1000,10000,50000)',
+        )
+        parser.add_argument(
+            '--skip-legacy-above',
+            type=int,
+            default=None,
+            help='Skip the legacy renderer for row counts above this value',
+        )
+
+    def render(self, flowables):
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+        start = time.perf_counter()
+        doc.build(FlowableStream(flowables))
+        return time.perf_counter() - start, buffer.tell()
+
+    def handle(self, *args, **options):
+        row_counts = [int(value) for value in options['rows'].split(',') if value]
+        results = []
+        for count in row_counts:
+            rows = [
+                [str(i), f'Benchmark product {i}', 'Category', f'Rs. {i % 1000}.99', 'In Stock', str(i % 50), '2025-01-01']
+                for i in range(count)
+            ]
+            result = {'rows': count}
+
+            if options['skip_legacy_above'] is None or count <= options['skip_legacy_above']:
+                # Table construction is part of the styling cost, so it is timed too
+                start = time.perf_counter()
+                flowables = legacy_table(rows)
+                build_seconds = time.perf_counter() - start
+                render_seconds, size = self.render(flowables)
+                result['legacy_seconds'] = round(build_seconds + render_seconds, 3)
+
+            start = time.perf_counter()
+            render_seconds, size = self.render(current_tables(rows))
+            result['current_seconds'] = round(time.perf_counter() - start, 3)
+            result['pdf_bytes'] = size
+
+            if 'legacy_seconds' in result:
+                result['speedup'] = round(result['legacy_seconds'] / result['current_seconds'], 2)
+            results.append(result)
+            self.stderr.write(f'{count} rows: {result}')
+
+        self.stdout.write(json.dumps(results, indent=2))
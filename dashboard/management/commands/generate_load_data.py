@@ -0,0 +1,159 @@
+import math
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from dashboard import caching
+from dashboard.models import Category, Product
+
+
+ADJECTIVES = (
+    'Ergonomic', 'Compact', 'Wireless', 'Portable', 'Premium', 'Classic', 'Smart', 'Rugged',
+    'Lightweight', 'Deluxe', 'Eco', 'Vintage', 'Modern', 'Foldable', 'Heavy-Duty', 'Organic',
+)
+MATERIALS = (
+    'Steel', 'Cotton', 'Bamboo', 'Leather', 'Ceramic', 'Aluminium', 'Wooden', 'Glass',
+    'Silicone', 'Wool', 'Carbon', 'Plastic', 'Linen', 'Copper', 'Marble', 'Nylon',
+)
+NOUNS = (
+    'Chair', 'Lamp', 'Backpack', 'Headphones', 'Kettle', 'Notebook', 'Jacket', 'Speaker',
+    'Bottle', 'Keyboard', 'Tent', 'Watch', 'Blender', 'Camera', 'Desk', 'Sneakers',
+    'Pillow', 'Drill', 'Mug', 'Router', 'Scarf', 'Monitor', 'Bicycle', 'Toaster',
+)
+CATEGORY_WORDS = (
+    'Electronics', 'Clothing', 'Books', 'Home', 'Garden', 'Sports', 'Toys', 'Food',
+    'Beauty', 'Outdoors', 'Office', 'Kitchen', 'Automotive', 'Music', 'Pets', 'Health',
+)
+PHRASES = (
+    'built to last', 'designed for everyday use', 'easy to clean', 'backed by a two-year warranty',
+    'ideal for travel', 'made from recycled materials', 'available in several colours',
+    'loved by professionals', 'perfect as a gift', 'tested for durability',
+)
+
+
+@contextmanager
+def explicit_timestamps(model):
+    """Let bulk_create keep the created_at/updated_at values set on the objects"""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a deterministic, seeded dataset of users, categories and products for load testing '
+        '(dates are relative to the current time)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10, help='Number of users')
+        parser.add_argument('--categories', type=int, default=50, help='Number of categories')
+        parser.add_argument('--products', type=int, default=100000, help='Number of products')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (same seed, same data)')
+        parser.add_argument('--days', type=int, default=730, help='Spread created_at over this many past days')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Products inserted per transaction')
+
+    def handle(self, *args, **options):
+        if min(options['users'], options['categories'], options['batch_size']) < 1 or options['products'] < 0:
+            raise CommandError('--users, --categories and --batch-size must be positive')
+        self.random = random.Random(options['seed'])
+        self.now = timezone.now()
+
+        users = self.create_users(options['users'])
+        categories = self.create_categories(options['categories'])
+        self.stdout.write(f'Using {len(users)} users and {len(categories)} categories')
+
+        started = time.monotonic()
+        created = 0
+        with explicit_timestamps(Product):
+            while created < options['products']:
+                size = min(options['batch_size'], options['products'] - created)
+                Product.objects.bulk_create(
+                    [self.product(created + i, users, categories, options['days']) for i in range(size)],
+                    batch_size=1000,
+                )
+                created += size
+                elapsed = time.monotonic() - started
+                self.stdout.write(f'{created} products ({created / elapsed if elapsed else 0:.0f} rows/sec)')
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Generated {created} products in {elapsed:.1f}s'))
+
+    def create_users(self, count):
+        password = make_password('loadtest')
+        usernames = [f'loaduser{i:04d}' for i in range(count)]
+        User.objects.bulk_create(
+            [User(username=name, email=f'{name}@example.com', password=password) for name in usernames],
+            ignore_conflicts=True,
+        )
+        return list(User.objects.filter(username__in=usernames).order_by('username').values_list('pk', flat=True))
+
+    def create_categories(self, count):
+        names = [
+            f'{CATEGORY_WORDS[i % len(CATEGORY_WORDS)]} {i // len(CATEGORY_WORDS) + 1}'
+            for i in range(count)
+        ]
+        Category.objects.bulk_create(
+            [Category(name=name, description=f'Load test category {name}') for name in names],
+            ignore_conflicts=True,
+        )
+        caching.bump('category')
+        return list(Category.objects.filter(name__in=names).order_by('name').values_list('pk', flat=True))
+
+    def product(self, index, users, categories, days):
+        rnd = self.random
+        name = f'{rnd.choice(ADJECTIVES)} {rnd.choice(MATERIALS)} {rnd.choice(NOUNS)} {index}'
+        noun = name.split()[-2].lower()
+        description = ' '.join(
+            f'This {noun} is {phrase}.' for phrase in rnd.sample(PHRASES, rnd.randint(1, 4))
+        )
+
+        # Long-tailed prices: most products are cheap, a few are expensive
+        price = Decimal(f'{min(rnd.lognormvariate(3.5, 1.0), 99999):.2f}')
+
+        # About 8% out of stock, 20% low stock, the rest spread over a wide range
+        roll = rnd.random()
+        if roll < 0.08:
+            stock = 0
+        elif roll < 0.28:
+            stock = rnd.randint(1, 10)
+        else:
+            stock = 11 + int(rnd.expovariate(1 / 120))
+
+        # Skewed towards recent dates, like a growing catalog
+        age = timedelta(days=days * (1 - math.sqrt(rnd.random())))
+        created_at = self.now - age
+        updated_at = created_at + (self.now - created_at) * rnd.random() ** 3
+
+        # A few categories hold most of the products
+        category = categories[min(int(rnd.paretovariate(1.2)) - 1, len(categories) - 1)]
+        if rnd.random() < 0.02:
+            category = None
+
+        return Product(
+            name=name,
+            description=description,
+            price=price,
+            category_id=category,
+            stock_quantity=stock,
+            rating=Decimal(f'{rnd.triangular(1, 5, 4.2):.1f}'),
+            created_by_id=rnd.choice(users),
+            created_at=created_at,
+            updated_at=updated_at,
+            is_active=rnd.random() > 0.05,
+        )
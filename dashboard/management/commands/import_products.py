@@ -0,0 +1,190 @@
+import csv
+import io
+import json
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from dashboard import caching
+from dashboard.models import Category, Product, ProductStats
+
+
+# Columns written by the PostgreSQL COPY path, in order
+COPY_COLUMNS = (
+    'name', 'description', 'price', 'category_id', 'stock_quantity', 'status',
+    'rating', 'created_by_id', 'created_at', 'updated_at', 'is_active',
+)
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+
+
+def read_csv(stream):
+    yield from csv.DictReader(stream)
+
+
+def read_ndjson(stream):
+    # Lines are decoded by parse_row, so a malformed line only skips that record
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield line
+
+
+READERS = {'csv': read_csv, 'ndjson': read_ndjson}
+
+
+def parse_row(row):
+    """
+    Turn one input record into Product field values
+
+    Expected keys: name, price and optionally description, category (name),
+    stock_quantity, rating and is_active. Raises ValueError for bad rows.
+    """
+    if isinstance(row, str):
+        row = json.loads(row)
+    name = (row.get('name') or '').strip()
+    if not name:
+        raise ValueError('name is required')
+    try:
+        price = Decimal(str(row.get('price', '')).strip())
+        stock_quantity = int(row.get('stock_quantity') or 0)
+        rating = Decimal(str(row.get('rating') or 0))
+    except (InvalidOperation, ValueError):
+        raise ValueError('price, stock_quantity and rating must be numbers')
+    if price < 0 or stock_quantity < 0 or not 0 <= rating <= 5:
+        raise ValueError('price and stock_quantity must be >= 0, rating between 0 and 5')
+    is_active = row.get('is_active', True)
+    if isinstance(is_active, str):
+        is_active = is_active.strip().lower() in TRUE_VALUES
+    return {
+        'name': name[:200],
+        'description': row.get('description') or None,
+        'price': price,
+        'category': (row.get('category') or '').strip() or None,
+        'stock_quantity': stock_quantity,
+        'rating': rating,
+        'is_active': bool(is_active),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Bulk import products from a CSV or NDJSON file (use - for stdin)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV/NDJSON file to import, or - to read stdin')
+        parser.add_argument('--format', choices=sorted(READERS), help='Input format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows inserted per transaction')
+        parser.add_argument('--user', help='Username recorded as creator (default: the first superuser)')
+        parser.add_argument('--copy', action='store_true', help='Insert with COPY (PostgreSQL only)')
+        parser.add_argument('--no-create-categories', action='store_true',
+                            help='Import rows with unknown categories without a category instead of creating them')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or Path(options['path']).suffix.lstrip('.').lower()
+        if fmt not in READERS:
+            raise CommandError('Cannot tell the input format; pass --format csv or --format ndjson')
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('--copy needs PostgreSQL')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        self.user = self.get_user(options['user'])
+        self.create_categories = not options['no_create_categories']
+        self.categories = dict(Category.objects.values_list('name', 'id'))
+        insert = self.insert_copy if options['copy'] else self.insert_bulk
+
+        if options['path'] == '-':
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8-sig')
+        else:
+            stream = open(options['path'], encoding='utf-8-sig', newline='')
+
+        started = time.monotonic()
+        imported = skipped = 0
+        batch = []
+        with stream:
+            for line, row in enumerate(READERS[fmt](stream), start=1):
+                try:
+                    batch.append(parse_row(row))
+                except (ValueError, AttributeError) as exc:
+                    skipped += 1
+                    self.stderr.write(f'Skipping record {line}: {exc}')
+                    continue
+                if len(batch) == options['batch_size']:
+                    imported += self.flush(batch, insert, imported, started)
+                    batch = []
+            if batch:
+                imported += self.flush(batch, insert, imported, started)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} products in {elapsed:.1f}s '
+            f'({imported / elapsed if elapsed else 0:.0f} rows/sec), skipped {skipped}'
+        ))
+
+    def get_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'User "{username}" does not exist')
+        user = User.objects.filter(is_superuser=True).order_by('pk').first()
+        if user is None:
+            raise CommandError('No superuser found; pass --user')
+        return user
+
+    def flush(self, batch, insert, imported, started):
+        self.resolve_categories(batch)
+        insert(batch)
+        imported += len(batch)
+        elapsed = time.monotonic() - started
+        self.stdout.write(f'{imported} rows ({imported / elapsed if elapsed else 0:.0f} rows/sec)')
+        return len(batch)
+
+    def resolve_categories(self, batch):
+        """Replace category names with ids, creating missing categories in one query"""
+        missing = {row['category'] for row in batch if row['category'] and row['category'] not in self.categories}
+        if missing and self.create_categories:
+            Category.objects.bulk_create([Category(name=name) for name in missing], ignore_conflicts=True)
+            self.categories.update(Category.objects.filter(name__in=missing).values_list('name', 'id'))
+            caching.bump('category')
+        for row in batch:
+            row['category_id'] = self.categories.get(row.pop('category'))
+
+    def insert_bulk(self, batch):
+        # ProductQuerySet.bulk_create derives status and updates the stats rollup
+        Product.objects.bulk_create(
+            [Product(created_by=self.user, **row) for row in batch],
+            batch_size=1000,
+        )
+
+    def insert_copy(self, batch):
+        now = timezone.now()
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        changes = []
+        for row in batch:
+            row['status'] = Product.status_for_stock(row['stock_quantity'])
+            writer.writerow([
+                row['name'], row['description'], row['price'], row['category_id'], row['stock_quantity'],
+                row['status'], row['rating'], self.user.pk, now, now, row['is_active'],
+            ])
+            changes.append((None, row))
+        buffer.seek(0)
+
+        sql = f"COPY dashboard_product ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                raw = cursor.cursor
+                if hasattr(raw, 'copy_expert'):
+                    # psycopg2
+                    raw.copy_expert(sql, buffer)
+                else:
+                    # psycopg 3
+                    with raw.copy(sql) as copy:
+                        copy.write(buffer.getvalue())
+            ProductStats.objects.apply_changes(changes)
+            caching.bump_on_commit('product')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from dashboard.changes import prune_tombstones, tombstone_cutoff
+
+
+class Command(BaseCommand):
+    help = 'Delete product tombstones older than PRODUCT_TOMBSTONE_RETENTION_DAYS (run daily)'
+
+    def handle(self, *args, **options):
+        cutoff = tombstone_cutoff()
+        deleted = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} tombstones older than {cutoff:%Y-%m-%d %H:%M}'))
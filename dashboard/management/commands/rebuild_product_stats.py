@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from dashboard.models import ProductStats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the materialized product statistics from the product table'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding product statistics...')
+        ProductStats.objects.rebuild()
+
+        stats = ProductStats.objects.get_stats()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Rebuilt stats for {ProductStats.objects.filter(category__isnull=False).count()} categories. '
+                f'Total products: {stats["total_products"]}'
+            )
+        )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from dashboard.search import install_search_index
+
+
+class Command(BaseCommand):
+    help = 'Recreate the product full-text search index and resynchronise it with the product table'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Rebuilding search index on {connection.vendor}...')
+        with connection.schema_editor() as schema_editor:
+            install_search_index(schema_editor)
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from dashboard.reports import STALE_JOB_AGE, claim_next_job, requeue_stale_jobs, run_report_job
+
+
+class Command(BaseCommand):
+    help = 'Render queued PDF reports in the background (run one or more of these next to the web workers)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process the queue until empty, then exit')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep when the queue is empty')
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs(STALE_JOB_AGE)
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale report jobs'))
+
+        self.stdout.write('Report worker started...')
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+                continue
+
+            self.stdout.write(f'Rendering report {job.pk}...')
+            job = run_report_job(job)
+            if job.status == 'done':
+                self.stdout.write(self.style.SUCCESS(f'Report {job.pk} done: {job.file.name}'))
+            else:
+                self.stdout.write(self.style.ERROR(f'Report {job.pk} failed:\n{job.error}'))
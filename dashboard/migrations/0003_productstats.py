@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:17
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def populate_product_stats(apps, schema_editor):
+    Product = apps.get_model('dashboard', 'Product')
+    ProductStats = apps.get_model('dashboard', 'ProductStats')
+
+    # Frozen copy of ProductStatsManager.aggregates(); migrations must not import app code
+    aggregates = {
+        'total_products': Count('id'),
+        'total_value': Sum('price', default=0),
+        'in_stock': Count('id', filter=Q(status='in_stock')),
+        'low_stock': Count('id', filter=Q(status='low_stock')),
+        'out_of_stock': Count('id', filter=Q(status='out_of_stock')),
+    }
+    grouped = (
+        Product.objects.order_by()
+        .filter(category__isnull=False)
+        .values('category')
+        .annotate(**aggregates)
+    )
+    rows = [ProductStats(category_id=row.pop('category'), **row) for row in grouped]
+    rows.append(ProductStats(category=None, **Product.objects.aggregate(**aggregates)))
+    ProductStats.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_remove_product_sku'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_products', models.IntegerField(default=0)),
+                ('total_value', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('in_stock', models.IntegerField(default=0)),
+                ('low_stock', models.IntegerField(default=0)),
+                ('out_of_stock', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='dashboard.category')),
+            ],
+            options={
+                'verbose_name_plural': 'Product stats',
+                'constraints': [models.UniqueConstraint(django.db.models.functions.comparison.Coalesce('category', 0), name='dashboard_productstats_unique_scope')],
+            },
+        ),
+        migrations.RunPython(populate_product_stats, migrations.RunPython.noop),
+    ]
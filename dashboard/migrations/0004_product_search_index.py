@@ -0,0 +1,78 @@
+from django.db import migrations
+
+
+# Frozen copy of the statements in dashboard/search.py at the time of this
+# migration; later changes to the search index need their own migration
+FTS_TABLE = 'dashboard_product_fts'
+
+POSTGRESQL_INSTALL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    ALTER TABLE dashboard_product ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english'::regconfig, coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS dashboard_product_search_vector_idx ON dashboard_product USING GIN (search_vector)",
+    "CREATE INDEX IF NOT EXISTS dashboard_product_name_trgm_idx ON dashboard_product USING GIN (name gin_trgm_ops)",
+]
+POSTGRESQL_REMOVE = [
+    "DROP INDEX IF EXISTS dashboard_product_name_trgm_idx",
+    "DROP INDEX IF EXISTS dashboard_product_search_vector_idx",
+    "ALTER TABLE dashboard_product DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_INSTALL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description, content='dashboard_product', content_rowid='id'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON dashboard_product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON dashboard_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, description ON dashboard_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_REMOVE = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def install(apps, schema_editor):
+    statements = {'postgresql': POSTGRESQL_INSTALL, 'sqlite': SQLITE_INSTALL}.get(schema_editor.connection.vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def remove(apps, schema_editor):
+    statements = {'postgresql': POSTGRESQL_REMOVE, 'sqlite': SQLITE_REMOVE}.get(schema_editor.connection.vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_productstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, remove),
+    ]
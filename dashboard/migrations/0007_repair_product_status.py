@@ -0,0 +1,34 @@
+from importlib import import_module
+
+from django.db import migrations, models
+from django.db.models import Case, Value, When
+
+
+def repair_product_status(apps, schema_editor):
+    """Fix statuses left stale by writes that bypassed Product.save(), then refresh the rollup"""
+    Product = apps.get_model('dashboard', 'Product')
+    ProductStats = apps.get_model('dashboard', 'ProductStats')
+
+    expected = Case(
+        When(stock_quantity=0, then=Value('out_of_stock')),
+        When(stock_quantity__lte=10, then=Value('low_stock')),
+        default=Value('in_stock'),
+        output_field=models.CharField(),
+    )
+    repaired = Product.objects.exclude(status=expected).update(status=expected)
+    if not repaired:
+        return
+
+    ProductStats.objects.all().delete()
+    import_module('dashboard.migrations.0003_productstats').populate_product_stats(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_reportjob'),
+    ]
+
+    operations = [
+        migrations.RunPython(repair_product_status, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,16 @@
-from django.db import models
+import uuid
+
+from django.db import connections, models, transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.expressions import Combinable
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import Exact, LessThanOrEqual
+from django.db.models.sql import DeleteQuery
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+
+from . import caching
 
 User = get_user_model()
 
@@ -18,6 +28,200 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+class InsufficientStock(Exception):
+    """A stock adjustment would take products below zero (or the products do not exist)"""
+
+    def __init__(self, product_ids):
+        self.product_ids = sorted(product_ids)
+        super().__init__(f"Insufficient stock for product(s): {', '.join(map(str, self.product_ids))}")
+
+
+class ProductQuerySet(models.QuerySet):
+    """QuerySet that keeps the ProductStats rollup in sync on bulk writes"""
+
+    def update(self, **kwargs):
+        # Keep status in step with stock in the same statement, and record the change
+        if 'stock_quantity' in kwargs and 'status' not in kwargs:
+            kwargs['status'] = Product.status_expression(kwargs['stock_quantity'])
+        kwargs.setdefault('updated_at', timezone.now())
+        with transaction.atomic(using=self.db):
+            if STATS_FIELDS.intersection(kwargs):
+                updated = self._update_with_stats(kwargs)
+            else:
+                updated = super().update(**kwargs)
+            # Registered after the UPDATE: outside a transaction on_commit runs at once
+            caching.bump_on_commit('product')
+        return updated
+
+    def _update_with_stats(self, kwargs):
+        """update() for changes to the rollup's fields; runs inside update()'s transaction"""
+        new_values = {
+            'category_id': kwargs.get('category_id', kwargs.get('category', F('category_id'))),
+            'price': kwargs.get('price', F('price')),
+            'status': kwargs.get('status', F('status')),
+        }
+        constants = {}
+        for field, value in new_values.items():
+            if not isinstance(value, Combinable):
+                constants[field] = Product._meta.get_field(field).to_python(getattr(value, 'pk', value))
+
+        if connections[self.db].features.has_select_for_update:
+            # Lock the rows in a statement of their own, so the read below sees
+            # their latest values and nothing moves them before the UPDATE
+            Product.objects.filter(pk__in=self.select_for_update().order_by().values('pk')).count()
+
+        # The rollup is moved by the difference the rows make, summed per
+        # (old category and status, new category and status) in the database
+        # with the new values computed the way the UPDATE will compute them
+        grouping = {
+            f'new_{field}': new_values[field]
+            for field in ('category_id', 'status') if field not in constants
+        }
+        totals = {'products': Count('pk'), 'old_value': Sum('price')}
+        if 'price' not in constants:
+            totals['new_value'] = Sum(new_values['price'])
+        groups = self.order_by().annotate(**grouping).values('category_id', 'status', *grouping).annotate(**totals)
+
+        changes = []
+        for group in groups:
+            new = {
+                field: constants[field] if field in constants else group[f'new_{field}']
+                for field in ('category_id', 'status')
+            }
+            if 'price' in constants:
+                new['price'] = constants['price'] * group['products']
+            else:
+                new['price'] = group['new_value']
+            old = {'category_id': group['category_id'], 'status': group['status'], 'price': group['old_value']}
+            changes.append(({**old, 'products': group['products']}, {**new, 'products': group['products']}))
+        updated = super().update(**kwargs)
+        if changes:
+            ProductStats.objects.apply_changes(changes)
+        return updated
+
+    def delete(self):
+        """
+        Delete the products without running the per-row post_delete receivers
+
+        Their work is done once for all rows instead: the ProductStats rollup
+        is moved by one UPDATE per category, the change feed tombstones are
+        written with one INSERT and the product version is bumped once.
+        Cached PDFs of deleted products are never served again and are left
+        to pdf_cache.evict(). Single instances (Product.delete()) still go
+        through the receivers.
+        """
+        if self.query.is_sliced or self.model._meta.related_objects:
+            # Let Django reject the slice, or cascade to the dependent rows
+            return super().delete()
+
+        with transaction.atomic(using=self.db):
+            rows = list(
+                self.select_for_update().order_by().values('pk', 'category_id', 'price', 'status')
+            )
+            pks = [row['pk'] for row in rows]
+            # By primary key, so rows matching the filter only after the read are kept
+            deleted = DeleteQuery(self.model).delete_batch(pks, self.db)
+            ProductStats.objects.apply_changes((row, None) for row in rows)
+            ProductTombstone.objects.bulk_create(ProductTombstone(product_id=pk) for pk in pks)
+            caching.bump_on_commit('product')
+        return deleted, {self.model._meta.label: deleted}
+
+    def adjust_stock(self, pk, delta):
+        """
+        Atomically add `delta` (negative to take stock) to one product's stock
+
+        Returns:
+            (stock_quantity, status) after the change
+
+        Raises:
+            InsufficientStock: the product has less than -delta in stock, or does not exist
+        """
+        return self.adjust_stock_many({pk: delta})[pk]
+
+    def adjust_stock_many(self, adjustments):
+        """
+        Atomically apply stock deltas to many products, all or nothing
+
+        Every product gets one conditional UPDATE (stock + delta, never
+        below zero, with the status derived in the same statement) instead
+        of a read-modify-write, so concurrent adjustments never lose
+        updates. Rows are updated in primary key order, so concurrent
+        batches lock them in the same order and cannot deadlock. The
+        ProductStats rollup is only touched when a status changes.
+
+        Args:
+            adjustments: Mapping of product id to delta, or iterable of
+                (product id, delta) pairs; deltas for the same id are summed
+
+        Returns:
+            Dict of product id to (stock_quantity, status) after the change
+
+        Raises:
+            InsufficientStock: listing every product that could not be adjusted;
+                nothing is changed in that case
+        """
+        if isinstance(adjustments, dict):
+            adjustments = adjustments.items()
+        deltas = {}
+        for pk, delta in adjustments:
+            deltas[pk] = deltas.get(pk, 0) + delta
+
+        now = timezone.now()
+        with transaction.atomic(using=self.db):
+            failed = []
+            for pk in sorted(deltas):
+                rows = self.filter(pk=pk)
+                if deltas[pk] < 0:
+                    rows = rows.filter(stock_quantity__gte=-deltas[pk])
+                stock = F('stock_quantity') + deltas[pk]
+                # QuerySet.update() directly: the rollup is adjusted incrementally below
+                updated = models.QuerySet.update(
+                    rows, stock_quantity=stock, status=Product.status_expression(stock), updated_at=now
+                )
+                if not updated:
+                    failed.append(pk)
+            if failed:
+                raise InsufficientStock(failed)
+
+            # Our UPDATEs hold the row locks, so these are exactly the values we wrote
+            products = self.model.objects.filter(pk__in=deltas).values(
+                'pk', 'stock_quantity', 'status', 'price', 'category_id'
+            )
+            changes = []
+            results = {}
+            for new in products:
+                results[new['pk']] = (new['stock_quantity'], new['status'])
+                old_status = Product.status_for_stock(new['stock_quantity'] - deltas[new['pk']])
+                if old_status != new['status']:
+                    changes.append(({**new, 'status': old_status}, new))
+            if changes:
+                ProductStats.objects.apply_changes(changes)
+            caching.bump_on_commit('product')
+        return results
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        # bulk_create() bypasses Product.save(), so derive the status here
+        for obj in objs:
+            obj.status = Product.status_for_stock(obj.stock_quantity)
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            ProductStats.objects.apply_changes((None, obj) for obj in objs)
+            caching.bump_on_commit('product')
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        fields = list(fields)
+        if 'stock_quantity' in fields:
+            for obj in objs:
+                obj.status = Product.status_for_stock(obj.stock_quantity)
+            if 'status' not in fields:
+                fields.append('status')
+        # Writes through update() per batch, which moves the ProductStats rollup
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+
 class Product(models.Model):
     STATUS_CHOICES = (
         ('in_stock', 'In Stock'),
@@ -68,18 +272,253 @@ class Product(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
     
+    objects = ProductQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
+        # Composite indexes matching the list, filter and keyset pagination access paths
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='product_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='product_status_created_idx'),
+            models.Index(fields=['category', '-created_at', '-id'], name='product_category_created_idx'),
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='product_active_created_idx',
+                condition=Q(is_active=True),
+            ),
+            # Change feed (ProductViewSet.changes) walks products in this order
+            models.Index(fields=['updated_at', 'id'], name='product_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name}"
     
+    @staticmethod
+    def status_for_stock(stock_quantity):
+        """Return the status a product with this stock quantity should have"""
+        if stock_quantity == 0:
+            return 'out_of_stock'
+        elif stock_quantity <= 10:
+            return 'low_stock'
+        return 'in_stock'
+    
+    @staticmethod
+    def status_expression(stock_quantity):
+        """
+        Database-side status_for_stock() for a stock value or expression
+        
+        Lets a single UPDATE derive the status from the new stock, e.g.
+        status=Product.status_expression(F('stock_quantity') - 1).
+        """
+        if not hasattr(stock_quantity, 'resolve_expression'):
+            stock_quantity = Value(stock_quantity)
+        return Case(
+            When(Exact(stock_quantity, 0), then=Value('out_of_stock')),
+            When(LessThanOrEqual(stock_quantity, 10), then=Value('low_stock')),
+            default=Value('in_stock'),
+            output_field=models.CharField(),
+        )
+    
     def save(self, *args, **kwargs):
         # Update status based on stock quantity
-        if self.stock_quantity == 0:
-            self.status = 'out_of_stock'
-        elif self.stock_quantity <= 10:
-            self.status = 'low_stock'
-        else:
-            self.status = 'in_stock'
-        super().save(*args, **kwargs)
\ No newline at end of file
+        self.status = self.status_for_stock(self.stock_quantity)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'stock_quantity' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'status'}
+        super().save(*args, **kwargs)
+
+
+# Product fields that contribute to the ProductStats rollup
+STATS_FIELDS = {'price', 'status', 'category', 'category_id'}
+
+
+class ProductStatsManager(models.Manager):
+    """Reads and maintains the materialized product statistics"""
+
+    @staticmethod
+    def aggregates():
+        """Aggregate expressions for the stats of a Product queryset"""
+        return {
+            'total_products': Count('id'),
+            'total_value': Sum('price', default=0),
+            'in_stock': Count('id', filter=Q(status='in_stock')),
+            'low_stock': Count('id', filter=Q(status='low_stock')),
+            'out_of_stock': Count('id', filter=Q(status='out_of_stock')),
+        }
+
+    def get_stats(self, category_id=None):
+        """Return the stats dict for all products or a single category"""
+        row = self.filter(category_id=category_id).values(*ProductStats.STAT_FIELDS).first()
+        if row is None:
+            row = self._rebuild_scope(category_id)
+        return row
+
+    def rebuild(self, category_ids=None):
+        """
+        Recompute the rollup from the product table
+
+        Args:
+            category_ids: Categories to refresh along with the global row,
+                or None to rebuild every row from scratch
+        """
+        with transaction.atomic(using=self.db):
+            if category_ids is None:
+                self.all().delete()
+                grouped = (
+                    Product.objects.order_by()
+                    .filter(category__isnull=False)
+                    .values('category')
+                    .annotate(**self.aggregates())
+                )
+                rows = [
+                    ProductStats(category_id=row.pop('category'), **row)
+                    for row in grouped
+                ]
+                rows.append(ProductStats(category=None, **Product.objects.aggregate(**self.aggregates())))
+                self.bulk_create(rows)
+                return
+
+            for category_id in {pk for pk in category_ids if pk is not None}:
+                self._rebuild_scope(category_id)
+            self._rebuild_scope(None)
+
+    def _rebuild_scope(self, category_id):
+        products = Product.objects.all()
+        if category_id is not None:
+            products = products.filter(category_id=category_id)
+        stats = products.aggregate(**self.aggregates())
+        self.update_or_create(category_id=category_id, defaults=stats)
+        return stats
+
+    def apply_change(self, old=None, new=None):
+        """
+        Incrementally move a product's contribution from its old to its new values
+
+        Args:
+            old: Product (or dict of category_id, price, status) before the change, or None if created
+            new: Product (or dict of category_id, price, status) after the change, or None if deleted
+        """
+        self.apply_changes([(old, new)])
+
+    def apply_changes(self, changes):
+        """
+        Apply many (old, new) changes (see apply_change) with one UPDATE per affected row
+
+        Used by bulk writes, so a batch costs a handful of queries rather than
+        a few per product. A dict may stand for several products sharing a
+        category and status: `products` is then their number and `price`
+        their total price.
+        """
+        deltas = {}
+        for values, sign in (pair for old, new in changes for pair in ((old, -1), (new, 1))):
+            if values is None:
+                continue
+            if not isinstance(values, dict):
+                values = {
+                    'category_id': values.category_id,
+                    'price': values.price,
+                    'status': values.status,
+                }
+            products = values.get('products', 1)
+            for category_id in {None, values['category_id']}:
+                delta = deltas.setdefault(category_id, {})
+                delta['total_products'] = delta.get('total_products', 0) + sign * products
+                delta['total_value'] = delta.get('total_value', 0) + sign * (values['price'] or 0)
+                if values['status'] in ProductStats.STATUS_FIELDS:
+                    delta[values['status']] = delta.get(values['status'], 0) + sign * products
+
+        for category_id, delta in deltas.items():
+            delta = {field: value for field, value in delta.items() if value}
+            if not delta:
+                continue
+            updated = self.filter(category_id=category_id).update(
+                **{field: F(field) + value for field, value in delta.items()}
+            )
+            if not updated:
+                self._rebuild_scope(category_id)
+
+
+class ProductStats(models.Model):
+    """Materialized product totals, globally (no category) and per category"""
+    STATUS_FIELDS = ('in_stock', 'low_stock', 'out_of_stock')
+    STAT_FIELDS = ('total_products', 'total_value') + STATUS_FIELDS
+
+    category = models.OneToOneField(
+        Category,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='stats'
+    )
+    total_products = models.IntegerField(default=0)
+    total_value = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    in_stock = models.IntegerField(default=0)
+    low_stock = models.IntegerField(default=0)
+    out_of_stock = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    objects = ProductStatsManager()
+    
+    class Meta:
+        verbose_name_plural = "Product stats"
+        constraints = [
+            models.UniqueConstraint(
+                Coalesce('category', 0),
+                name='dashboard_productstats_unique_scope',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"Stats for {self.category or 'all products'}"
+
+
+class ReportJob(models.Model):
+    """A products PDF report rendered in the background by the report worker"""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='report_jobs'
+    )
+    filters = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='pending'
+    )
+    file = models.FileField(upload_to='reports/', blank=True, null=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='reportjob_status_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Report {self.pk} ({self.status})"
+
+
+class ProductTombstone(models.Model):
+    """Record of a deleted product, so the change feed can report the deletion"""
+    product_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['deleted_at', 'id']
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='tombstone_deleted_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Product {self.product_id} deleted at {self.deleted_at}"
@@ -0,0 +1,282 @@
+import base64
+import binascii
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import Q
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+from .search import RANKED_ORDERING, search_ordering
+
+
+def estimate_count(queryset):
+    """
+    Return a cheap row count for a queryset
+
+    On PostgreSQL this is the planner's row estimate, which costs no table
+    scan; other databases fall back to an exact COUNT(*).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def querystring_without(request, param):
+    """Encode the current GET parameters minus `param`, ready to prefix another parameter"""
+    params = request.GET.copy()
+    params.pop(param, None)
+    encoded = params.urlencode()
+    return f'{encoded}&' if encoded else ''
+
+
+class KeysetPage:
+    """A page of results produced by KeysetPaginator"""
+
+    def __init__(self, object_list, next_cursor, previous_cursor, count=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Cursor (keyset) paginator for template views
+
+    Pages are addressed by an opaque cursor holding the ordering values of
+    the boundary row, so each page is a single indexed range query and
+    costs the same no matter how deep it is. The ordering must end with a
+    unique field; annotations such as a search rank may be used as well.
+    """
+    LAST = 'last'
+
+    def __init__(self, queryset, per_page, ordering=('-created_at', '-id'), count=None):
+        """
+        Args:
+            queryset: QuerySet to paginate
+            per_page: Number of rows per page
+            ordering: Field names (prefixed with '-' for descending), ending in a unique field
+            count: Optional callable returning the total row count, or None to skip counting
+        """
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.count = count
+
+    def get_page(self, cursor=None):
+        """Return the page for a cursor; invalid or missing cursors give the first page"""
+        queryset, key, reverse = self._page_queryset(cursor)
+        rows = list(queryset)
+        count = self.count() if self.count is not None else None
+        return self._page(rows, key, reverse, count)
+
+    async def aget_page(self, cursor=None):
+        """get_page() for async views; `count` must then return an awaitable"""
+        queryset, key, reverse = self._page_queryset(cursor)
+        rows = [row async for row in queryset]
+        count = await self.count() if self.count is not None else None
+        return self._page(rows, key, reverse, count)
+
+    def _page_queryset(self, cursor):
+        """The query for a cursor's page (one row extra to tell if there are more), its key and direction"""
+        direction, key = self._decode(cursor)
+        reverse = direction == 'previous'
+
+        queryset = self.queryset.order_by(*self._order_by(reverse))
+        if key is not None:
+            queryset = queryset.filter(self._after(key, reverse))
+        return queryset[:self.per_page + 1], key, reverse
+
+    def _page(self, rows, key, reverse, count):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if reverse:
+                if has_more:
+                    previous_cursor = self._encode('previous', rows[0])
+                if key is not None:
+                    next_cursor = self._encode('next', rows[-1])
+            else:
+                if has_more:
+                    next_cursor = self._encode('next', rows[-1])
+                if key is not None:
+                    previous_cursor = self._encode('previous', rows[0])
+
+        return KeysetPage(rows, next_cursor, previous_cursor, count=count)
+
+    def cursor_after(self, obj):
+        """Cursor for the page that starts right after `obj`"""
+        return self._encode('next', obj)
+
+    def _order_by(self, reverse):
+        ordering = []
+        for field in self.ordering:
+            descending = field.startswith('-')
+            if reverse:
+                descending = not descending
+            ordering.append(f"{'-' if descending else ''}{field.lstrip('-')}")
+        return ordering
+
+    def _after(self, key, reverse):
+        """Build the row-value comparison `(fields) > key` for the ordering"""
+        names = [field.lstrip('-') for field in self.ordering]
+        conditions = []
+        for index, field in enumerate(self.ordering):
+            descending = field.startswith('-') != reverse
+            lookup = f"{names[index]}__{'lt' if descending else 'gt'}"
+            condition = Q(**{lookup: key[index]})
+            for tied in range(index):
+                condition &= Q(**{names[tied]: key[tied]})
+            conditions.append(condition)
+        return reduce(or_, conditions)
+
+    def _encode(self, direction, obj):
+        values = []
+        for name in self.ordering:
+            field = self._field(name.lstrip('-'))
+            if field is None:
+                values.append(getattr(obj, name.lstrip('-')))
+            else:
+                values.append(field.value_to_string(obj))
+        payload = json.dumps({'d': direction, 'k': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def _decode(self, cursor):
+        if cursor == self.LAST:
+            return 'previous', None
+        if not cursor:
+            return 'next', None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            direction, values = payload['d'], payload['k']
+            if direction not in ('next', 'previous') or len(values) != len(self.ordering):
+                raise ValueError(cursor)
+            key = []
+            for name, value in zip(self.ordering, values):
+                field = self._field(name.lstrip('-'))
+                key.append(value if field is None else field.to_python(value))
+        except (binascii.Error, ValueError, KeyError, TypeError, UnicodeDecodeError):
+            return 'next', None
+        return direction, key
+
+    def _field(self, name):
+        """Return the model field for an ordering name, or None for annotations"""
+        try:
+            return self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+
+
+class EstimatedCountCursorPagination(CursorPagination):
+    """
+    Cursor pagination for the REST API
+
+    The total is omitted by default; clients can ask for an estimate
+    with `?count=true`.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.total = None
+        if request.query_params.get(self.count_query_param) in ('1', 'true'):
+            self.total = estimate_count(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.total is not None:
+            response.data['count'] = self.total
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count'] = {'type': 'integer', 'example': 123}
+        return response_schema
+
+
+class ProductCursorPagination(EstimatedCountCursorPagination):
+    """
+    Cursor pagination for products
+
+    Ranked search results are paged with KeysetPaginator on the whole
+    (search_rank, id) key: DRF's cursor only positions on the first
+    ordering field, and ranks tie too often for that.
+    """
+    ordering = ('-created_at', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset_page = None
+        ordering = self.get_ordering(request, queryset, view)
+        if ordering != RANKED_ORDERING:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.total = None
+        if request.query_params.get(self.count_query_param) in ('1', 'true'):
+            self.total = estimate_count(queryset)
+        self.base_url = request.build_absolute_uri()
+        self.keyset_page = KeysetPaginator(queryset, self.page_size, ordering=ordering).get_page(
+            request.query_params.get(self.cursor_query_param)
+        )
+        self.display_page_controls = self.template is not None and self.keyset_page.has_other_pages()
+        return list(self.keyset_page)
+
+    def get_ordering(self, request, queryset, view):
+        if 'search_rank' in queryset.query.annotations:
+            return search_ordering(queryset)
+        return super().get_ordering(request, queryset, view)
+
+    def get_next_link(self):
+        if self.keyset_page is None:
+            return super().get_next_link()
+        return self._keyset_link(self.keyset_page.next_cursor)
+
+    def get_previous_link(self):
+        if self.keyset_page is None:
+            return super().get_previous_link()
+        return self._keyset_link(self.keyset_page.previous_cursor)
+
+    def _keyset_link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+
+class CategoryCursorPagination(EstimatedCountCursorPagination):
+    ordering = ('name', 'id')
@@ -0,0 +1,33 @@
+import json
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline-delimited JSON (one object per line) lazily
+
+    `request.data` is a generator, so a large upload is decoded line by line
+    as it is consumed instead of being loaded at once. A line that is not
+    valid JSON is yielded as a ParseError so callers can report it per item.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', 'utf-8')
+        if stream is None:
+            return iter(())
+        return self._items(stream, encoding)
+
+    @staticmethod
+    def _items(stream, encoding):
+        for line in iter(stream.readline, b''):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line.decode(encoding))
+            except ValueError as exc:
+                yield ParseError(f'JSON parse error - {exc}')
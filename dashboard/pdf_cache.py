@@ -0,0 +1,112 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .caching import count
+from .utils import SINGLE_PRODUCT_PDF_VERSION, generate_single_product_pdf
+
+
+# Defaults, overridable in settings
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+
+HITS_KEY = 'pdf_cache:hits'
+MISSES_KEY = 'pdf_cache:misses'
+
+
+def cache_dir():
+    return Path(getattr(settings, 'PDF_CACHE_DIR', Path(settings.MEDIA_ROOT) / 'pdf_cache'))
+
+
+def cache_key(product):
+    """
+    Content address of a product's PDF: its identity, last change, the last
+    change of its category (whose name is printed) and the template version
+    """
+    updated_at = product.updated_at.isoformat() if product.updated_at else ''
+    category = product.category
+    category_updated_at = category.updated_at.isoformat() if category and category.updated_at else ''
+    source = f"{product.pk}:{updated_at}:{product.category_id}:{category_updated_at}:{SINGLE_PRODUCT_PDF_VERSION}"
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def get_product_pdf(product):
+    """
+    Return the cached PDF for a product, rendering it on a miss
+
+    Args:
+        product: Product object
+
+    Returns:
+        Tuple of (path to the PDF file, cache key)
+    """
+    key = cache_key(product)
+    directory = cache_dir()
+    path = directory / f"{product.pk}-{key}.pdf"
+
+    if path.exists():
+        # Refresh the modification time; eviction removes the least recently used files
+        try:
+            os.utime(path)
+            count(HITS_KEY)
+            return path, key
+        except FileNotFoundError:
+            pass
+
+    count(MISSES_KEY)
+    directory.mkdir(parents=True, exist_ok=True)
+    pdf_buffer = generate_single_product_pdf(product)
+    # Write to a temporary file first so concurrent readers never see a partial PDF
+    with tempfile.NamedTemporaryFile(dir=directory, suffix='.tmp', delete=False) as tmp:
+        tmp.write(pdf_buffer.getvalue())
+    os.replace(tmp.name, path)
+    invalidate(product.pk, keep=path)
+    evict()
+    return path, key
+
+
+def invalidate(product_pk, keep=None):
+    """Delete every cached PDF of a product (except `keep`)"""
+    directory = cache_dir()
+    if not directory.exists():
+        return
+    for path in directory.glob(f"{product_pk}-*.pdf"):
+        if path != keep:
+            path.unlink(missing_ok=True)
+
+
+def evict(max_bytes=None):
+    """Delete least recently used PDFs until the cache fits within its size limit"""
+    if max_bytes is None:
+        max_bytes = getattr(settings, 'PDF_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+    entries = []
+    for path in cache_dir().glob('*.pdf'):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+
+
+def cache_stats():
+    """Hit/miss counters and current size of the PDF cache"""
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    files = list(cache_dir().glob('*.pdf')) if cache_dir().exists() else []
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+        'entries': len(files),
+        'bytes': sum(path.stat().st_size for path in files if path.exists()),
+    }
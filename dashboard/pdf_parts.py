@@ -0,0 +1,168 @@
+"""
+ReportLab building blocks for product reports
+
+This module deliberately has no Django imports, so report parts can be
+rendered in freshly spawned worker processes (see generate_product_pdf's
+parallel mode) without configuring Django there.
+"""
+from io import BytesIO
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+
+
+# Rows per table when every table is forced onto its own page (parallel mode)
+PDF_ROWS_PER_PAGE = 36
+DOC_OPTIONS = dict(pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18, pageCompression=1)
+
+
+class FlowableStream(list):
+    """
+    Flowable list that ReportLab consumes while it is lazily refilled
+
+    ReportLab's build loop pops flowables off the front of the list it is
+    given, so feeding it from a generator keeps only a small window of
+    flowables (and the product rows behind them) in memory at a time.
+    """
+
+    def __init__(self, flowables, lookahead=4):
+        super().__init__()
+        self._source = iter(flowables)
+        self._lookahead = lookahead
+
+    def __len__(self):
+        while list.__len__(self) < self._lookahead:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                break
+        return list.__len__(self)
+
+
+# Shared style for every products table; alternating rows use ROWBACKGROUNDS
+# so ReportLab resolves them in one pass instead of one style command per row
+PRODUCT_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4F46E5')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.HexColor('#F9FAFB'), colors.HexColor('#FFFFFF')]),
+    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#E5E7EB')),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 10),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+])
+PRODUCT_TABLE_HEADERS = ['ID', 'Name', 'Category', 'Price', 'Status', 'Stock', 'Created Date']
+PRODUCT_TABLE_COL_WIDTHS = [0.5*inch, 2*inch, 1.2*inch, 0.8*inch, 1*inch, 0.8*inch, 1*inch]
+
+
+def product_table(rows):
+    """Build one page-sized products table (header row included)"""
+    data = [PRODUCT_TABLE_HEADERS] + rows
+    return Table(data, colWidths=PRODUCT_TABLE_COL_WIDTHS, repeatRows=1, style=PRODUCT_TABLE_STYLE)
+
+
+def report_styles():
+    """Return the (title, subtitle) paragraph styles of the products report"""
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        spaceAfter=30,
+        alignment=1,  # Center alignment
+        textColor=colors.darkblue
+    )
+    
+    subtitle_style = ParagraphStyle(
+        'CustomSubtitle',
+        parent=styles['Heading2'],
+        fontSize=14,
+        spaceAfter=20,
+        alignment=1,
+        textColor=colors.grey
+    )
+    return title_style, subtitle_style
+
+
+def summary_table(stats):
+    """Build the summary statistics table from a get_product_stats() dict"""
+    summary_data = [
+        ['Summary Statistics', ''],
+        ['Total Products', str(stats['total_products'])],
+        ['Total Value', f"Rs. {stats['total_value']:.2f}"],
+        ['In Stock', str(stats['in_stock'])],
+        ['Out of Stock', str(stats['out_of_stock'])],
+    ]
+    
+    table = Table(summary_data, colWidths=[2*inch, 1.5*inch])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#10B981')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F0FDF4')),
+        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#D1FAE5')),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 10),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ]))
+    return table
+
+
+def _page_numbers(first_page, total_pages):
+    """onPage callback drawing 'Page X of Y', offset for a part that starts at `first_page`"""
+    def draw(canvas, doc):
+        canvas.saveState()
+        canvas.setFont('Helvetica', 8)
+        canvas.setFillColor(colors.grey)
+        canvas.drawRightString(A4[0] - 72, 8, f"Page {first_page + doc.page - 1} of {total_pages}")
+        canvas.restoreState()
+    return draw
+
+
+def _render(flowables, first_page, total_pages):
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, **DOC_OPTIONS)
+    on_page = _page_numbers(first_page, total_pages)
+    doc.build(FlowableStream(flowables), onFirstPage=on_page, onLaterPages=on_page)
+    return buffer.getvalue()
+
+
+def render_cover_part(title, generated_on, stats, total_pages):
+    """Render page 1 of a parallel report: title, timestamp and summary"""
+    title_style, subtitle_style = report_styles()
+    flowables = [
+        Paragraph(title, title_style),
+        Paragraph(f"Generated on: {generated_on}", subtitle_style),
+        Spacer(1, 20),
+        summary_table(stats),
+    ]
+    return _render(flowables, 1, total_pages)
+
+
+def render_rows_part(rows, first_page, total_pages):
+    """
+    Render a run of product rows, one PDF_ROWS_PER_PAGE table per page
+
+    Args:
+        rows: List of row value lists (see PRODUCT_TABLE_HEADERS)
+        first_page: Page number of this part's first page in the final document
+        total_pages: Page count of the final document
+
+    Returns:
+        PDF bytes of this part
+    """
+    def flowables():
+        for start in range(0, len(rows), PDF_ROWS_PER_PAGE):
+            if start:
+                yield PageBreak()
+            yield product_table(rows[start:start + PDF_ROWS_PER_PAGE])
+    return _render(flowables(), first_page, total_pages)
@@ -0,0 +1,130 @@
+from .forms import ProductSearchForm
+from .models import Product
+from .search import DEFAULT_SEARCH_MODE, search_ordering, search_products
+
+
+class InvalidFilters(ValueError):
+    """Request parameters that are not valid product filters (e.g. an unknown category)"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f"Invalid filters: {', '.join(sorted(errors))}")
+
+
+class ProductQuery:
+    """
+    Filtered products queryset shared by the views, exports, reports and API
+
+    Holds the ProductSearchForm filters (search, search_mode, category,
+    status) and builds the queryset for a given consumer, so filtering,
+    joins, column pruning and ordering are defined in one place.
+
+    Usage:
+        query = ProductQuery.from_params(request.GET)
+        products = query.queryset('report')
+    """
+    # Matches the product_created_idx / product_*_created_idx indexes
+    DEFAULT_ORDERING = ('-created_at', '-id')
+
+    # Columns each consumer reads (None loads every column); created_at is
+    # always needed because keyset cursors are built from it
+    PROJECTIONS = {
+        'list': ('id', 'name', 'price', 'stock_quantity', 'created_at'),
+        'report': ('id', 'name', 'price', 'status', 'stock_quantity', 'created_at', 'category__name'),
+        'api': None,
+    }
+    # Relations each consumer follows, fetched in the same query
+    RELATED = {
+        'list': (),
+        'report': ('category',),
+        'api': ('category', 'created_by'),
+    }
+
+    def __init__(self, search='', search_mode=DEFAULT_SEARCH_MODE, category=None, status=''):
+        """
+        Args:
+            search: Search text ('' for no search)
+            search_mode: One of SEARCH_MODE_CHOICES
+            category: Category instance or None
+            status: Product status ('' for any)
+        """
+        self.search = search
+        self.search_mode = search_mode
+        self.category = category
+        self.status = status
+
+    @classmethod
+    def from_form(cls, form):
+        """Build a query from a ProductSearchForm; invalid fields are ignored"""
+        # Validation keeps the valid fields in cleaned_data even when others fail
+        form.is_valid()
+        data = form.cleaned_data if form.is_bound else {}
+        return cls(
+            search=data.get('search') or '',
+            search_mode=data.get('search_mode') or DEFAULT_SEARCH_MODE,
+            category=data.get('category'),
+            status=data.get('status') or '',
+        )
+
+    @classmethod
+    def from_params(cls, params):
+        """
+        Build a query from request parameters (GET, query_params or a job's filters)
+
+        Unlike the HTML search form (from_form), an invalid filter is an
+        error rather than dropped, so it never widens the result to every
+        product.
+
+        Raises:
+            InvalidFilters: with the form errors per field
+        """
+        form = ProductSearchForm(params or None)
+        if form.is_bound and not form.is_valid():
+            raise InvalidFilters({field: list(errors) for field, errors in form.errors.items()})
+        return cls.from_form(form)
+
+    @property
+    def filtered(self):
+        return bool(self.search or self.category or self.status)
+
+    def ordering(self, products):
+        """Ordering of a queryset built by queryset(); ends in a unique field so it can be keyset paginated"""
+        return search_ordering(products) if self.search else self.DEFAULT_ORDERING
+
+    @property
+    def cache_key(self):
+        """The filters as a hashable tuple, for keying cached results"""
+        return (self.search, self.search_mode, getattr(self.category, 'pk', None), self.status)
+
+    def queryset(self, projection='api', columns=None):
+        """
+        Build the filtered, ordered queryset
+
+        Args:
+            projection: Key of PROJECTIONS naming the consumer ('list', 'report' or 'api')
+            columns: Optional explicit column list (e.g. 'name', 'category__name')
+                overriding the projection; related columns are joined
+
+        Returns:
+            QuerySet of Product objects, ordered by ordering()
+        """
+        if columns is not None:
+            related = {column.split('__')[0] for column in columns if '__' in column}
+            columns = {'id', 'created_at', *columns}
+        else:
+            related, columns = self.RELATED[projection], self.PROJECTIONS[projection]
+
+        products = Product.objects.all()
+        if related:
+            products = products.select_related(*related)
+        if columns:
+            products = products.only(*columns)
+
+        if self.category:
+            products = products.filter(category=self.category)
+        if self.status:
+            products = products.filter(status=self.status)
+        if self.search:
+            # Annotates search_rank and orders by search_ordering()
+            return search_products(products, self.search, self.search_mode)
+        return products.order_by(*self.DEFAULT_ORDERING)
@@ -0,0 +1,85 @@
+import traceback
+from datetime import timedelta
+
+from django.core.files import File
+from django.utils import timezone
+
+from .models import ReportJob
+from .queries import ProductQuery
+from .utils import generate_product_pdf
+
+
+# Filter parameters a report job accepts (the ProductSearchForm fields)
+REPORT_FILTER_FIELDS = ('search', 'search_mode', 'category', 'status')
+# Running jobs older than this are assumed to belong to a dead worker
+STALE_JOB_AGE = timedelta(hours=1)
+
+
+def enqueue_report(user, params):
+    """
+    Queue a products PDF report for the background worker
+
+    Args:
+        user: User requesting the report
+        params: Mapping of request parameters; only the search filters are kept
+
+    Returns:
+        The pending ReportJob
+
+    Raises:
+        InvalidFilters: a filter is not valid; nothing is queued
+    """
+    filters = {
+        field: str(params[field])
+        for field in REPORT_FILTER_FIELDS
+        if params.get(field) not in (None, '')
+    }
+    # The worker builds the same query, and fails the job if a filter has become invalid since
+    ProductQuery.from_params(filters)
+    return ReportJob.objects.create(created_by=user, filters=filters)
+
+
+def claim_next_job():
+    """
+    Atomically take the oldest pending job
+
+    The claim is a conditional UPDATE, so any number of workers can poll the
+    same table without handing a job out twice.
+
+    Returns:
+        The claimed ReportJob (now running), or None if the queue is empty
+    """
+    while True:
+        job = ReportJob.objects.filter(status='pending').order_by('created_at').first()
+        if job is None:
+            return None
+        claimed = ReportJob.objects.filter(pk=job.pk, status='pending').update(
+            status='running', started_at=timezone.now()
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def requeue_stale_jobs(max_age):
+    """Put jobs left running longer than `max_age` (e.g. by a crashed worker) back in the queue"""
+    cutoff = timezone.now() - max_age
+    return ReportJob.objects.filter(status='running', started_at__lt=cutoff).update(
+        status='pending', started_at=None
+    )
+
+
+def run_report_job(job):
+    """Render a claimed job's PDF into MEDIA_ROOT and record the outcome"""
+    try:
+        pdf_file = generate_product_pdf(ProductQuery.from_params(job.filters).queryset('report'), "Products Report")
+        with pdf_file:
+            job.file.save(f"products_report_{job.pk}.pdf", File(pdf_file), save=False)
+        job.status = 'done'
+    except Exception:
+        job.status = 'failed'
+        job.error = traceback.format_exc()
+    job.finished_at = timezone.now()
+    job.save()
+    return job
+
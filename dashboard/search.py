@@ -0,0 +1,172 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+
+SEARCH_MODE_CHOICES = (
+    ('fts', 'Best match'),
+    ('fuzzy', 'Fuzzy'),
+    ('contains', 'Contains'),
+)
+DEFAULT_SEARCH_MODE = 'fts'
+
+# Ordering for ranked search results; ends in a unique field so it can be keyset paginated
+RANKED_ORDERING = ('-search_rank', '-id')
+# Ordering when every result has the same rank (plain substring matches)
+UNRANKED_ORDERING = ('-created_at', '-id')
+
+FTS_TABLE = 'dashboard_product_fts'
+
+POSTGRESQL_INSTALL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    ALTER TABLE dashboard_product ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english'::regconfig, coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS dashboard_product_search_vector_idx ON dashboard_product USING GIN (search_vector)",
+    "CREATE INDEX IF NOT EXISTS dashboard_product_name_trgm_idx ON dashboard_product USING GIN (name gin_trgm_ops)",
+]
+POSTGRESQL_REMOVE = [
+    "DROP INDEX IF EXISTS dashboard_product_name_trgm_idx",
+    "DROP INDEX IF EXISTS dashboard_product_search_vector_idx",
+    "ALTER TABLE dashboard_product DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_INSTALL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description, content='dashboard_product', content_rowid='id'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON dashboard_product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON dashboard_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, description ON dashboard_product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_REMOVE = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def install_search_index(schema_editor):
+    """
+    Create the full-text search index for products
+
+    PostgreSQL gets a generated tsvector column with a GIN index plus a
+    trigram index on the name; SQLite gets an FTS5 table kept in sync by
+    triggers. Both are maintained by the database on every write path.
+    Safe to run again, e.g. after SQLite rebuilt the product table.
+    """
+    vendor = schema_editor.connection.vendor
+    statements = {'postgresql': POSTGRESQL_INSTALL, 'sqlite': SQLITE_INSTALL}.get(vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def remove_search_index(schema_editor):
+    """Drop the full-text search index created by install_search_index"""
+    vendor = schema_editor.connection.vendor
+    statements = {'postgresql': POSTGRESQL_REMOVE, 'sqlite': SQLITE_REMOVE}.get(vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def _sqlite_match_query(term):
+    """Turn free text into an FTS5 query: every word must match, as a prefix"""
+    words = re.findall(r'\w+', term)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def _has_fts_table(connection):
+    with connection.cursor() as cursor:
+        return FTS_TABLE in connection.introspection.table_names(cursor)
+
+
+def search_ordering(queryset):
+    """
+    Ordering of a search_products() queryset
+
+    Results are ordered by rank, unless the rank is a constant (the
+    substring fallback), in which case every row would tie and the newest
+    products come first instead.
+    """
+    if isinstance(queryset.query.annotations.get('search_rank'), Value):
+        return UNRANKED_ORDERING
+    return RANKED_ORDERING
+
+
+def search_products(queryset, term, mode=DEFAULT_SEARCH_MODE):
+    """
+    Filter products by a search term and annotate a relevance score
+
+    Args:
+        queryset: QuerySet of Product objects
+        term: Search text entered by the user
+        mode: 'fts' for ranked full-text search, 'fuzzy' for trigram
+            similarity on the name, 'contains' for a plain substring match
+
+    Returns:
+        QuerySet annotated with `search_rank` (higher is better) and
+        ordered by search_ordering()
+    """
+    connection = connections[queryset.db]
+    vendor = connection.vendor
+
+    # PostgreSQL ranks are cast to float8: a real would not compare equal to
+    # itself after a round trip through a keyset cursor
+    if mode == 'fts' and vendor == 'postgresql':
+        query = "websearch_to_tsquery('english'::regconfig, %s)"
+        queryset = queryset.filter(
+            RawSQL(f'"dashboard_product"."search_vector" @@ {query}', [term], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL(
+                f'ts_rank("dashboard_product"."search_vector", {query})::float8', [term], output_field=FloatField()
+            )
+        )
+    elif mode == 'fts' and vendor == 'sqlite' and _has_fts_table(connection):
+        match = _sqlite_match_query(term)
+        if not match:
+            return queryset.none()
+        queryset = queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        ).annotate(
+            search_rank=RawSQL(
+                f'SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s AND rowid = "dashboard_product"."id"',
+                [match],
+                output_field=FloatField(),
+            )
+        )
+    elif mode == 'fuzzy' and vendor == 'postgresql':
+        queryset = queryset.filter(
+            RawSQL('"dashboard_product"."name" %% %s', [term], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL('similarity("dashboard_product"."name", %s)::float8', [term], output_field=FloatField())
+        )
+    else:
+        queryset = queryset.filter(
+            Q(name__icontains=term) | Q(description__icontains=term)
+        ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    return queryset.order_by(*search_ordering(queryset))
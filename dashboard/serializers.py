@@ -1,5 +1,32 @@
+from itertools import islice
+
 from rest_framework import serializers
-from .models import Product, Category
+from django.urls import reverse
+
+from .choices import category_names, get_category
+from .models import Product, Category, ReportJob
+
+
+class CategoryField(serializers.PrimaryKeyRelatedField):
+    """Category by primary key, validated against the cached category names instead of a query"""
+    
+    def __init__(self, **kwargs):
+        kwargs.setdefault('queryset', Category.objects.all())
+        super().__init__(**kwargs)
+    
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            category = get_category(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if category is None:
+            self.fail('does_not_exist', pk_value=data)
+        return category
+    
+    def get_choices(self, cutoff=None):
+        return dict(islice(category_names().items(), cutoff))
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -12,6 +39,9 @@ class CategorySerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at']
     
     def get_product_count(self, obj):
+        # Annotated by CategoryViewSet; fall back to a query for freshly saved instances
+        if hasattr(obj, 'product_count'):
+            return obj.product_count
         return obj.products.count()
 
 
@@ -29,10 +59,48 @@ class ProductSerializer(serializers.ModelSerializer):
             'created_by', 'created_by_name', 'created_at', 'updated_at', 'is_active'
         ]
         read_only_fields = ['created_by', 'created_at', 'updated_at', 'status']
+    
+    # Model columns behind fields that do not map one-to-one onto a column
+    FIELD_COLUMNS = {
+        'category_name': 'category__name',
+        'created_by_name': 'created_by__username',
+        'status_display': 'status',
+    }
+    
+    def __init__(self, *args, fields=None, **kwargs):
+        """
+        Args:
+            fields: Optional subset of Meta.fields to serialize (sparse fieldset)
+        """
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+    
+    @classmethod
+    def parse_fields(cls, param):
+        """
+        Parse a `fields=name,price` parameter into a list of field names
+
+        Returns None when no fields are given; raises ValidationError for unknown ones.
+        """
+        if not param:
+            return None
+        fields = [name.strip() for name in param.split(',') if name.strip()]
+        unknown = [name for name in fields if name not in cls.Meta.fields]
+        if unknown:
+            raise serializers.ValidationError({'fields': f"Unknown field(s): {', '.join(unknown)}"})
+        return fields
+    
+    @classmethod
+    def columns_for(cls, fields):
+        """Return the model columns (for QuerySet.only()) needed to serialize `fields`"""
+        return [cls.FIELD_COLUMNS.get(name, name) for name in fields]
 
 
 class ProductCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating/updating Product"""
+    category = CategoryField(required=False, allow_null=True)
     
     class Meta:
         model = Product
@@ -50,3 +118,31 @@ class ProductCreateSerializer(serializers.ModelSerializer):
         if value < 0:
             raise serializers.ValidationError("Stock quantity cannot be negative.")
         return value
+
+
+class StockAdjustmentSerializer(serializers.Serializer):
+    """A stock change for one product; `id` is only needed in batches"""
+    id = serializers.IntegerField(required=False)
+    delta = serializers.IntegerField()
+    
+    def validate_delta(self, value):
+        if value == 0:
+            raise serializers.ValidationError("Delta cannot be zero.")
+        return value
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    """Serializer for background PDF report jobs"""
+    download_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ReportJob
+        fields = ['id', 'status', 'filters', 'error', 'download_url', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
+    
+    def get_download_url(self, obj):
+        if obj.status != 'done':
+            return None
+        url = reverse('api-reports-download', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
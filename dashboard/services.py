@@ -0,0 +1,34 @@
+from asgiref.sync import sync_to_async
+
+from .caching import aread_through, read_through
+from .models import ProductStats
+
+
+def _is_unfiltered(products):
+    return products is None or not (products.query.has_filters() or products.query.is_sliced)
+
+
+def get_product_stats(products=None):
+    """
+    Compute product statistics
+
+    Unfiltered requests are answered from the materialized ProductStats
+    rollup (cached until the next product write); filtered querysets fall
+    back to a single aggregate query.
+
+    Args:
+        products: Optional QuerySet of Product objects (defaults to all products)
+
+    Returns:
+        Dict with total_products, total_value and per-status counts
+    """
+    if _is_unfiltered(products):
+        return read_through('stats', 'all', ProductStats.objects.get_stats)
+    return products.order_by().aggregate(**ProductStats.objects.aggregates())
+
+
+async def aget_product_stats(products=None):
+    """get_product_stats() for async views"""
+    if _is_unfiltered(products):
+        return await aread_through('stats', 'all', sync_to_async(ProductStats.objects.get_stats))
+    return await products.order_by().aaggregate(**ProductStats.objects.aggregates())
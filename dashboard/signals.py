@@ -0,0 +1,75 @@
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import caching, pdf_cache
+from .models import Category, Product, ProductStats, ProductTombstone
+
+
+@receiver(pre_save, sender=Product)
+def capture_stats_snapshot(sender, instance, **kwargs):
+    """Remember the stored values that the ProductStats rollup counted"""
+    instance._stats_snapshot = None
+    if instance.pk:
+        instance._stats_snapshot = (
+            Product.objects.filter(pk=instance.pk)
+            .values('category_id', 'price', 'status')
+            .first()
+        )
+
+
+@receiver(post_save, sender=Product)
+def update_stats_on_save(sender, instance, **kwargs):
+    """Move the product's contribution in the rollup to its new values"""
+    ProductStats.objects.apply_change(
+        old=getattr(instance, '_stats_snapshot', None),
+        new=instance,
+    )
+
+
+@receiver(post_delete, sender=Product)
+def update_stats_on_delete(sender, instance, **kwargs):
+    """Remove a deleted product from the rollup"""
+    ProductStats.objects.apply_change(old=instance)
+
+
+@receiver(post_delete, sender=Product)
+def record_product_tombstone(sender, instance, **kwargs):
+    """Keep the deletion visible to the change feed"""
+    ProductTombstone.objects.create(product_id=instance.pk)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_pdf(sender, instance, **kwargs):
+    """Drop cached single-product PDFs once the product changes"""
+    pdf_cache.invalidate(instance.pk)
+
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_reads(sender, instance, **kwargs):
+    """Retire cached product lists, details and stats"""
+    caching.bump_on_commit('product')
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def touch_category_products(sender, instance, created=False, **kwargs):
+    """
+    Move the products of a renamed or deleted category into the change feed
+
+    The feed sends each product's category and category name; a rename does
+    not write the products, and a delete sets their category to NULL
+    without Product.save(). Runs inside the delete's transaction.
+    """
+    if not created:
+        Product.objects.filter(category=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_reads(sender, instance, **kwargs):
+    """Retire cached category lists, and product reads showing category names"""
+    caching.bump_on_commit('category', 'product')
@@ -1,3 +1,773 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from . import bulk, caching, reports
+from .changes import encode_cursor
+from .models import Category, Product, ProductStats, ProductTombstone, ReportJob
+from .pagination import KeysetPaginator
+from .serializers import ProductCreateSerializer
+
+
+# Keeps the tests away from the (shared, file based) development cache
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+NO_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class DashboardTestCase(TestCase):
+    """Logged in API client plus helpers to seed products"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('tester', password='unused', is_staff=True)
+        self.client.force_login(self.user)
+        self.category = Category.objects.create(name='Lighting')
+
+    def create_products(self, count, name='Desk lamp', category=None, **fields):
+        fields.setdefault('price', Decimal('9.99'))
+        fields.setdefault('stock_quantity', 20)
+        return Product.objects.bulk_create([
+            Product(
+                name=f'{name} {i}', description='Seeded by the tests',
+                category=category or self.category, created_by=self.user, **fields
+            )
+            for i in range(count)
+        ])
+
+    def assertStatsMatchProducts(self):
+        """The materialized rollup agrees with a fresh aggregate over the products"""
+        expected = Product.objects.aggregate(**ProductStats.objects.aggregates())
+        self.assertEqual(ProductStats.objects.get_stats(), expected)
+        for category in Category.objects.all():
+            expected = category.products.aggregate(**ProductStats.objects.aggregates())
+            if expected['total_products']:
+                self.assertEqual(ProductStats.objects.get_stats(category.pk), expected)
+
+    def walk(self, url):
+        """Follow the `next` links from `url`; returns the ids of every page, in order"""
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['id'] for row in response.json()['results'])
+            url = response.json()['next']
+        return ids
+
+
+class SearchPaginationTests(DashboardTestCase):
+    """Ranked search results page on (search_rank, id), so tied ranks are not repeated"""
+
+    def setUp(self):
+        super().setUp()
+        # Identical names and descriptions: every row has the same rank
+        self.products = self.create_products(45)
+        self.create_products(5, name='Office chair')
+
+    def assertWalksEveryMatch(self, search_mode):
+        ids = self.walk(f'/api/products/?search=lamp&search_mode={search_mode}&page_size=10')
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), {product.pk for product in self.products})
+
+    def test_fts_pages_are_unique(self):
+        self.assertWalksEveryMatch('fts')
+
+    def test_contains_pages_are_unique(self):
+        self.assertWalksEveryMatch('contains')
+
+    def test_previous_link_returns_the_first_page(self):
+        first = self.client.get('/api/products/?search=lamp&page_size=10').json()
+        second = self.client.get(first['next']).json()
+        back = self.client.get(second['previous']).json()
+        self.assertEqual([row['id'] for row in back['results']], [row['id'] for row in first['results']])
+
+
+class QueryPlanTests(TestCase):
+    """The product list/filter/sort queries of views.py and api_views.py are planned as index scans"""
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # Small test tables would otherwise always be sequentially scanned
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+            self.addCleanup(self.reset_seqscan)
+
+    def reset_seqscan(self):
+        with connection.cursor() as cursor:
+            cursor.execute('RESET enable_seqscan')
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(index, plan, f'expected {index}, got:\n{plan}')
+
+    def test_product_list(self):
+        self.assertUsesIndex(Product.objects.order_by('-created_at', '-id')[:11], 'product_created_idx')
+
+    def test_deep_keyset_page(self):
+        now = timezone.now()
+        products = Product.objects.filter(Q(created_at__lt=now) | Q(created_at=now, id__lt=1))
+        self.assertUsesIndex(products.order_by('-created_at', '-id')[:11], 'product_created_idx')
+
+    def test_filter_by_status(self):
+        products = Product.objects.filter(status='low_stock')
+        self.assertUsesIndex(products.order_by('-created_at', '-id')[:11], 'product_status_created_idx')
+
+    def test_filter_by_category(self):
+        products = Product.objects.filter(category_id=1)
+        self.assertUsesIndex(products.order_by('-created_at', '-id')[:11], 'product_category_created_idx')
+
+    def test_active_products(self):
+        products = Product.objects.filter(is_active=True)
+        self.assertUsesIndex(products.order_by('-created_at', '-id')[:11], 'product_active_created_idx')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ReadThroughTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_stores_committed_reads(self):
+        calls = []
+        for _ in range(2):
+            caching.read_through('stats', 'test', lambda: calls.append(1))
+        self.assertEqual(len(calls), 1)
+
+    def test_skips_reads_inside_a_transaction(self):
+        with transaction.atomic():
+            caching.read_through('stats', 'test', lambda: 'rolled back')
+            transaction.set_rollback(True)
+        self.assertEqual(caching.read_through('stats', 'test', lambda: 'fresh'), 'fresh')
+
+    def test_update_bumps_after_writing(self):
+        user = User.objects.create_user('tester', password='unused')
+        product = Product.objects.create(name='Lamp', price=Decimal('1.00'), created_by=user)
+        seen = []
+        def spy(*models):
+            seen.append(Product.objects.values_list('name', 'price').get(pk=product.pk))
+        with mock.patch.object(caching, 'bump', spy):
+            # Without (name) and with (price) a ProductStats change
+            Product.objects.filter(pk=product.pk).update(name='Desk lamp')
+            Product.objects.filter(pk=product.pk).update(price=Decimal('2.00'))
+        self.assertEqual(seen, [('Desk lamp', Decimal('1.00')), ('Desk lamp', Decimal('2.00'))])
+
+
+@override_settings(CACHES=NO_CACHES)
+class QueryCountTests(DashboardTestCase):
+    """Every list and detail endpoint runs the same number of queries at any data size"""
+
+    def endpoints(self, product):
+        return [
+            ('product list', '/api/products/?page_size=100'),
+            ('product search', '/api/products/?search=lamp&page_size=100'),
+            ('product filter', f'/api/products/?category={self.category.pk}&status=in_stock&page_size=100'),
+            ('product detail', f'/api/products/{product.pk}/'),
+            ('product stats', '/api/products/stats/'),
+            ('product changes', '/api/products/changes/?limit=100'),
+            ('category list', '/api/categories/?page_size=100'),
+            ('category detail', f'/api/categories/{self.category.pk}/'),
+            ('dashboard', '/dashboard/'),
+            ('dashboard product list', '/dashboard/products/'),
+            ('dashboard product detail', f'/dashboard/products/{product.pk}/'),
+        ]
+
+    def seed(self, per_category):
+        self.create_products(per_category)
+        self.create_products(per_category, category=Category.objects.create(name=f'Category {per_category}'))
+        # Products of other users are shown with their creator
+        other = User.objects.create_user(f'other-{per_category}', password='unused')
+        self.create_products(per_category, name='Floor lamp')
+        Product.objects.filter(name__startswith='Floor lamp').update(created_by=other)
+
+    @override_settings(CHANGES_SETTLE_SECONDS=0)
+    def test_query_counts_do_not_grow_with_the_data(self):
+        self.seed(5)
+        product = Product.objects.order_by('pk').first()
+        small = {}
+        for label, url in self.endpoints(product):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            small[label] = len(queries)
+
+        self.seed(50)
+        for label, url in self.endpoints(product):
+            with self.subTest(label), self.assertNumQueries(small[label]):
+                self.client.get(url)
+
+
+class KeysetPaginationTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.products = self.create_products(23)
+        # Tied timestamps must page by id instead of repeating rows
+        moment = timezone.now() - timedelta(days=1)
+        Product.objects.filter(pk__in=[product.pk for product in self.products[5:15]]).update(created_at=moment)
+        self.expected = list(Product.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+
+    def test_next_cursors_visit_every_row_once(self):
+        paginator = KeysetPaginator(Product.objects.all(), 5)
+        ids, cursor = [], None
+        while True:
+            page = paginator.get_page(cursor)
+            ids.extend(product.pk for product in page)
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(ids, self.expected)
+
+    def test_previous_cursors_from_the_last_page(self):
+        paginator = KeysetPaginator(Product.objects.all(), 5)
+        ids, cursor = [], KeysetPaginator.LAST
+        while True:
+            page = paginator.get_page(cursor)
+            ids[:0] = [product.pk for product in page]
+            if not page.has_previous():
+                break
+            cursor = page.previous_cursor
+        self.assertEqual(ids, self.expected)
+
+    def test_invalid_cursor_gives_the_first_page(self):
+        page = KeysetPaginator(Product.objects.all(), 5).get_page('not-a-cursor')
+        self.assertEqual([product.pk for product in page], self.expected[:5])
+
+    def test_api_pages(self):
+        self.assertEqual(self.walk('/api/products/?page_size=5'), self.expected)
+
+
+class StockAdjustmentTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.first, self.second = self.create_products(2, stock_quantity=12)
+
+    def adjust(self, product, delta):
+        return self.client.post(
+            f'/api/products/{product.pk}/stock/', {'delta': delta}, content_type='application/json'
+        )
+
+    def test_adjusts_stock_and_status(self):
+        response = self.adjust(self.first, -3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'id': self.first.pk, 'stock_quantity': 9, 'status': 'low_stock'})
+        self.first.refresh_from_db()
+        self.assertEqual((self.first.stock_quantity, self.first.status), (9, 'low_stock'))
+        self.assertStatsMatchProducts()
+
+    def test_insufficient_stock_changes_nothing(self):
+        response = self.adjust(self.first, -13)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['product_ids'], [self.first.pk])
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.stock_quantity, 12)
+
+    def test_zero_delta_is_rejected(self):
+        self.assertEqual(self.adjust(self.first, 0).status_code, 400)
+
+    def test_batch_is_all_or_nothing(self):
+        response = self.client.post('/api/products/stock/', [
+            {'id': self.first.pk, 'delta': -12},
+            {'id': self.second.pk, 'delta': -20},
+        ], content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['product_ids'], [self.second.pk])
+        self.assertEqual(
+            sorted(Product.objects.values_list('stock_quantity', flat=True)), [12, 12]
+        )
+
+    def test_batch_sums_deltas_per_product(self):
+        response = self.client.post('/api/products/stock/', [
+            {'id': self.first.pk, 'delta': -12},
+            {'id': self.second.pk, 'delta': 5},
+            {'id': self.second.pk, 'delta': -1},
+        ], content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [
+            {'id': self.first.pk, 'stock_quantity': 0, 'status': 'out_of_stock'},
+            {'id': self.second.pk, 'stock_quantity': 16, 'status': 'in_stock'},
+        ])
+        self.assertStatsMatchProducts()
+
+
+class BulkEndpointTests(DashboardTestCase):
+    url = '/api/products/bulk/'
+
+    def send(self, method, items):
+        return getattr(self.client, method)(self.url, items, content_type='application/json')
+
+    def test_create_reports_each_item(self):
+        response = self.send('post', [
+            {'name': 'Table lamp', 'price': '19.99', 'stock_quantity': 4, 'category': self.category.pk},
+            {'name': '', 'price': '-1'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['summary'], {'created': 1, 'error': 1})
+        created = Product.objects.get(pk=body['results'][0]['id'])
+        self.assertEqual((created.status, created.created_by), ('low_stock', self.user))
+        self.assertEqual(body['results'][1]['index'], 1)
+        self.assertStatsMatchProducts()
+
+    def test_update_derives_status(self):
+        product, other = self.create_products(2)
+        response = self.send('patch', [
+            {'id': product.pk, 'stock_quantity': 0},
+            {'id': 0, 'stock_quantity': 1},
+        ])
+        self.assertEqual(response.json()['summary'], {'updated': 1, 'error': 1})
+        product.refresh_from_db()
+        self.assertEqual(product.status, 'out_of_stock')
+        self.assertStatsMatchProducts()
+
+    def test_update_keeps_other_fields_of_each_product(self):
+        priced, stocked = self.create_products(2)
+
+        def serializer(product, **kwargs):
+            # A stock adjustment landing after the batch read its products
+            if product.pk == priced.pk:
+                Product.objects.adjust_stock(priced.pk, -5)
+            return ProductCreateSerializer(product, **kwargs)
+        with mock.patch.object(bulk, 'ProductCreateSerializer', serializer):
+            response = self.send('patch', [
+                {'id': priced.pk, 'price': '1.00'},
+                {'id': stocked.pk, 'stock_quantity': 3},
+            ])
+        self.assertEqual(response.json()['summary'], {'updated': 2})
+        priced.refresh_from_db()
+        self.assertEqual((priced.price, priced.stock_quantity), (Decimal('1.00'), 15))
+        self.assertStatsMatchProducts()
+
+    def test_delete_ids_and_objects(self):
+        first, second, kept = self.create_products(3)
+        response = self.send('delete', [first.pk, {'id': second.pk}, 0])
+        self.assertEqual(response.json()['summary'], {'deleted': 2, 'error': 1})
+        self.assertEqual(list(Product.objects.values_list('pk', flat=True)), [kept.pk])
+        self.assertStatsMatchProducts()
+
+    def test_delete_queries_do_not_grow_with_the_batch(self):
+        def delete_queries(count):
+            ids = [product.pk for product in self.create_products(count)]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.send('delete', ids)
+            self.assertEqual(response.json()['summary'], {'deleted': count})
+            self.assertEqual(ProductTombstone.objects.filter(product_id__in=ids).count(), count)
+            return len(queries)
+        self.assertEqual(delete_queries(10), delete_queries(50))
+        self.assertStatsMatchProducts()
+
+    def test_rejects_a_body_that_is_not_a_list(self):
+        for body in ('{"name": "Lamp"}', '5', '"lamp"', 'null'):
+            with self.subTest(body=body):
+                response = self.client.post(self.url, body, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+
+    def test_ndjson_body(self):
+        body = '{"name": "Lamp A", "price": "5.00", "stock_quantity": 50}\n{"name": "Lamp B", "price": "6.00"}\n'
+        response = self.client.post(self.url, body, content_type='application/x-ndjson')
+        self.assertEqual(response.json()['summary'], {'created': 2})
+
+
+@override_settings(CHANGES_SETTLE_SECONDS=0)
+class ChangeFeedTests(DashboardTestCase):
+    url = '/api/products/changes/'
+
+    def test_full_sync_then_changes(self):
+        first, second, third = self.create_products(3)
+        page = self.client.get(self.url, {'limit': 2}).json()
+        self.assertEqual([row['id'] for row in page['changed']], [first.pk, second.pk])
+        self.assertTrue(page['has_more'])
+        page = self.client.get(self.url, {'limit': 2, 'cursor': page['cursor']}).json()
+        self.assertEqual([row['id'] for row in page['changed']], [third.pk])
+        self.assertFalse(page['has_more'])
+
+        cursor = page['cursor']
+        page = self.client.get(self.url, {'cursor': cursor}).json()
+        self.assertEqual((page['changed'], page['deleted']), ([], []))
+
+        first.stock_quantity = 3
+        first.save()
+        deleted_pk = second.pk
+        second.delete()
+        page = self.client.get(self.url, {'cursor': cursor}).json()
+        self.assertEqual([row['id'] for row in page['changed']], [first.pk])
+        self.assertEqual([row['id'] for row in page['deleted']], [deleted_pk])
+
+    def test_bulk_deletes_are_reported(self):
+        products = self.create_products(3)
+        cursor = self.client.get(self.url).json()['cursor']
+        Product.objects.filter(pk__in=[product.pk for product in products[:2]]).delete()
+        deleted = self.client.get(self.url, {'cursor': cursor}).json()['deleted']
+        self.assertEqual(sorted(row['id'] for row in deleted), sorted(product.pk for product in products[:2]))
+
+    def test_category_rename_and_delete_are_reported(self):
+        product = self.create_products(1)[0]
+        cursor = self.client.get(self.url).json()['cursor']
+        self.category.name = 'Lamps'
+        self.category.save()
+        page = self.client.get(self.url, {'cursor': cursor}).json()
+        self.assertEqual([row['category_name'] for row in page['changed']], ['Lamps'])
+
+        self.category.delete()
+        page = self.client.get(self.url, {'cursor': page['cursor']}).json()
+        self.assertEqual([(row['id'], row['category']) for row in page['changed']], [(product.pk, None)])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': 'garbage'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'limit': 0}).status_code, 400)
+
+    def test_expired_cursor(self):
+        old = timezone.now() - timedelta(days=365)
+        cursor = encode_cursor({'products': None, 'deleted': (old, 0)})
+        self.assertEqual(self.client.get(self.url, {'cursor': cursor}).status_code, 410)
+
+
+class ConditionalGetTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.first, self.second = self.create_products(2)
+
+    def assertRevalidates(self, url, change):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_product_detail(self):
+        self.assertRevalidates(
+            f'/api/products/{self.first.pk}/',
+            lambda: self.client.patch(
+                f'/api/products/{self.first.pk}/', {'price': '1.00'}, content_type='application/json'
+            ),
+        )
+
+    def test_product_detail_follows_its_category(self):
+        def rename():
+            self.category.name = 'Lamps'
+            self.category.save()
+        self.assertRevalidates(f'/api/products/{self.first.pk}/', rename)
+
+    def test_list_after_deleting_an_older_product(self):
+        self.assertRevalidates('/api/products/', lambda: Product.objects.filter(pk=self.first.pk).delete())
+
+    def test_stats(self):
+        self.assertRevalidates('/api/products/stats/', lambda: self.create_products(1))
+
+    def test_dashboard_page(self):
+        self.client.get('/dashboard/products/')  # sets the CSRF cookie, which is part of the ETag
+        self.assertRevalidates('/dashboard/products/', lambda: self.create_products(1))
+
+    def test_last_modified_follows_deletions(self):
+        cache.set(caching.MODIFIED_KEY.format('product'), time.time() - 60, timeout=None)
+        cache.set(caching.MODIFIED_KEY.format('category'), time.time() - 60, timeout=None)
+        url = f'/api/products/?category={self.category.pk}'
+        since = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=since).status_code, 304)
+        # The newest product is still shown, so the latest updated_at does not change
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(pk=self.first.pk).delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=since).status_code, 200)
+
+    def test_non_numeric_pk_is_not_found(self):
+        for url in ('/api/products/abc/', '/api/categories/abc/'):
+            with self.subTest(url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_other_users_get_their_own_etag(self):
+        etag = self.client.get('/api/products/')['ETag']
+        other = User.objects.create_user('other', password='unused')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ProductPdfTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        pdf_settings = override_settings(PDF_CACHE_DIR=directory.name)
+        pdf_settings.enable()
+        self.addCleanup(pdf_settings.disable)
+        self.product = self.create_products(1)[0]
+        self.url = f'/dashboard/products/{self.product.pk}/pdf/'
+
+    def test_cached_pdf_is_revalidated(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_category_rename_changes_the_pdf(self):
+        etag = self.client.get(self.url)['ETag']
+        self.category.name = 'Lamps'
+        self.category.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class ProductStatsTests(DashboardTestCase):
+    """Bulk writes move the materialized rollup without rebuilding it"""
+
+    def setUp(self):
+        super().setUp()
+        self.other = Category.objects.create(name='Furniture')
+        self.products = self.create_products(6, stock_quantity=5)
+        self.create_products(3, category=self.other, price=Decimal('100.00'))
+
+    def test_update_with_values(self):
+        Product.objects.filter(pk__in=[product.pk for product in self.products[:3]]).update(
+            category=self.other, price='2.50', stock_quantity=0
+        )
+        self.assertStatsMatchProducts()
+
+    def test_update_with_expressions(self):
+        Product.objects.filter(category=self.category).update(price=F('price') * 2, stock_quantity=F('stock_quantity') + 20)
+        self.assertStatsMatchProducts()
+
+    def test_update_to_no_category(self):
+        Product.objects.filter(category=self.other).update(category=None)
+        self.assertStatsMatchProducts()
+
+    def test_bulk_update(self):
+        for product in self.products[:4]:
+            product.stock_quantity = 0
+            product.price = Decimal('1.00')
+            product.category = self.other
+        Product.objects.bulk_update(self.products[:4], ['stock_quantity', 'category'])
+        self.assertStatsMatchProducts()
+
+    def test_bulk_update_does_not_scan_the_table(self):
+        self.products[0].price = Decimal('3.00')
+        with CaptureQueriesContext(connection) as queries:
+            Product.objects.bulk_update(self.products[:1], ['price'])
+        sums = [query['sql'] for query in queries if 'SUM(' in query['sql'].upper()]
+        self.assertTrue(all('WHERE' in sql.upper() for sql in sums), sums)
+        self.assertStatsMatchProducts()
+
+    def test_update_queries_do_not_grow_with_the_rows(self):
+        def update_queries(products):
+            with CaptureQueriesContext(connection) as queries:
+                Product.objects.filter(pk__in=[product.pk for product in products]).update(
+                    price=F('price') + 1, stock_quantity=0
+                )
+            return len(queries)
+        self.assertEqual(update_queries(self.products[:1]), update_queries(self.products[1:]))
+        self.assertStatsMatchProducts()
+
+
+class InvalidFilterTests(DashboardTestCase):
+    """API, exports and reports reject invalid filters instead of returning every product"""
+
+    invalid = ({'category': '999'}, {'category': 'abc'}, {'status': 'bogus'}, {'search_mode': 'exact'})
+
+    def setUp(self):
+        super().setUp()
+        self.create_products(2)
+
+    def test_api_and_exports(self):
+        urls = (
+            '/api/products/', '/api/async/products/',
+            '/dashboard/products/export/csv/', '/dashboard/products/pdf/',
+        )
+        for url in urls:
+            for params in self.invalid:
+                with self.subTest(url=url, params=params):
+                    response = self.client.get(url, params)
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(list(response.json()), list(params))
+
+    def test_report_jobs(self):
+        for params in self.invalid:
+            with self.subTest(params=params):
+                self.assertEqual(self.client.post('/api/reports/', params).status_code, 400)
+        self.assertEqual(self.client.post('/dashboard/products/pdf/async/?category=999').status_code, 400)
+        self.assertFalse(ReportJob.objects.exists())
+
+    def test_report_job_of_a_deleted_category_fails(self):
+        other = Category.objects.create(name='Furniture')
+        self.assertEqual(self.client.post('/api/reports/', {'category': other.pk}).status_code, 202)
+        other.delete()
+        job = reports.run_report_job(reports.claim_next_job())
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('InvalidFilters', job.error)
+
+    def test_html_list_ignores_invalid_filters(self):
+        response = self.client.get('/dashboard/products/', {'category': '999', 'search': 'lamp'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['products']), 2)
+
+
+class ExportTests(DashboardTestCase):
+    """CSV, NDJSON and XLSX exports stream the same products as the filtered list"""
+
+    def setUp(self):
+        super().setUp()
+        self.create_products(3, stock_quantity=5)
+        self.create_products(2, stock_quantity=50)
+        self.create_products(2, category=Category.objects.create(name='Furniture'), stock_quantity=5)
+        self.params = {'category': self.category.pk, 'status': 'low_stock'}
+
+    def export(self, fmt):
+        """Rows of an export, as dicts of strings keyed by the export headers"""
+        response = self.client.get(f'/dashboard/products/export/{fmt}/', self.params)
+        self.assertEqual(response.status_code, 200)
+        body = b''.join(response.streaming_content)
+        if fmt == 'csv':
+            return list(csv.DictReader(io.StringIO(body.decode())))
+        if fmt == 'ndjson':
+            return [json.loads(line) for line in body.decode().splitlines()]
+        rows = load_workbook(io.BytesIO(body), read_only=True)['Products'].iter_rows(values_only=True)
+        headers = next(rows)
+        return [dict(zip(headers, row)) for row in rows]
+
+    def test_filtered_export_matches_the_list(self):
+        listed = self.client.get('/api/products/', self.params).json()['results']
+        self.assertEqual(len(listed), 3)
+        for fmt in ('csv', 'ndjson', 'xlsx'):
+            with self.subTest(fmt):
+                rows = self.export(fmt)
+                self.assertEqual([int(row['id']) for row in rows], [row['id'] for row in listed])
+                self.assertEqual({row['category'] for row in rows}, {'Lighting'})
+                self.assertEqual({row['status'] for row in rows}, {'low_stock'})
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get('/dashboard/products/export/pdfx/').status_code, 404)
+
+
+class ReportQueueTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=directory.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.create_products(3)
+
+    def test_claimed_job_renders_and_downloads(self):
+        response = self.client.post('/api/reports/', {'status': 'in_stock'})
+        self.assertEqual(response.status_code, 202)
+        job = reports.claim_next_job()
+        self.assertEqual((str(job.pk), job.status), (response.json()['id'], 'running'))
+        # A job is handed out once
+        self.assertIsNone(reports.claim_next_job())
+
+        job = reports.run_report_job(job)
+        self.assertEqual(job.status, 'done', job.error)
+        for url in (f'/api/reports/{job.pk}/download/', f'/dashboard/reports/{job.pk}/download/'):
+            with self.subTest(url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+    def test_pending_job_cannot_be_downloaded(self):
+        job = reports.enqueue_report(self.user, {})
+        self.assertEqual(self.client.get(f'/api/reports/{job.pk}/download/').status_code, 404)
+
+
+class ImportProductsTests(DashboardTestCase):
+    def import_file(self, content, suffix, *args):
+        with tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False) as source:
+            source.write(content)
+        self.addCleanup(os.unlink, source.name)
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('import_products', source.name, '--user', 'tester', *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_bad_rows_are_skipped_and_counted(self):
+        stdout, stderr = self.import_file(
+            'name,price,category,stock_quantity\n'
+            'Table lamp,19.99,Lighting,4\n'
+            'Broken lamp,cheap,Lighting,1\n'
+            'Sofa,499.00,Furniture,30\n'
+            ',1.00,,\n',
+            '.csv', '--batch-size', '1',
+        )
+        self.assertIn('Skipping record 2: price, stock_quantity and rating must be numbers', stderr)
+        self.assertIn('Skipping record 4: name is required', stderr)
+        self.assertIn('Imported 2 products', stdout)
+        self.assertIn('skipped 2', stdout)
+        products = {product.name: product for product in Product.objects.select_related('category')}
+        self.assertEqual(sorted(products), ['Sofa', 'Table lamp'])
+        self.assertEqual((products['Table lamp'].category, products['Table lamp'].status), (self.category, 'low_stock'))
+        self.assertEqual(products['Sofa'].category.name, 'Furniture')
+        self.assertStatsMatchProducts()
+
+    def test_ndjson_batches(self):
+        lines = [json.dumps({'name': f'Lamp {i}', 'price': '5.00'}) for i in range(5)]
+        stdout, stderr = self.import_file('\n'.join([*lines, '{not json']) + '\n', '.ndjson', '--batch-size', '2')
+        self.assertIn('Skipping record 6', stderr)
+        # Progress after two full batches and the remainder
+        progress = [line.split(' ')[0] for line in stdout.splitlines() if ' rows (' in line]
+        self.assertEqual(progress, ['2', '4', '5'])
+        self.assertEqual(Product.objects.count(), 5)
+        self.assertStatsMatchProducts()
+
+
+class SparseFieldsTests(DashboardTestCase):
+    """`?fields=` limits both the serialized fields and the selected columns"""
+
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_products(2)[0]
+
+    def test_list_and_detail(self):
+        for url in ('/api/products/?fields=id,name,price', f'/api/products/{self.product.pk}/?fields=id,name,price'):
+            with self.subTest(url), CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                body = response.json()
+                rows = body['results'] if 'results' in body else [body]
+                self.assertEqual({tuple(row) for row in rows}, {('id', 'name', 'price')})
+                selects = [query['sql'] for query in queries if '"dashboard_product"."name"' in query['sql']]
+                self.assertTrue(selects)
+                self.assertFalse(any('"description"' in sql for sql in selects), selects)
+
+    def test_category_name_joins_the_category(self):
+        rows = self.client.get('/api/products/?fields=name,category_name').json()['results']
+        self.assertEqual({row['category_name'] for row in rows}, {'Lighting'})
+
+    def test_unknown_field(self):
+        response = self.client.get('/api/products/?fields=name,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['fields'])
+
+
+class AsyncViewTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.async_client.force_login(self.user)
+
+    async def test_search_matches_the_sync_api(self):
+        await sync_to_async(self.create_products)(3)
+        for search_mode in ('fts', 'contains'):
+            url = f'/api/products/?search=lamp&search_mode={search_mode}'
+            response = await self.async_client.get(url.replace('/api/', '/api/async/'))
+            self.assertEqual(response.status_code, 200)
+            expected = (await sync_to_async(self.client.get)(url)).json()['results']
+            self.assertEqual(
+                [row['id'] for row in response.json()['results']], [row['id'] for row in expected]
+            )
+
+    async def test_dashboard_revalidates(self):
+        await self.async_client.get('/dashboard/async/')  # sets the CSRF cookie, which is part of the ETag
+        etag = (await self.async_client.get('/dashboard/async/'))['ETag']
+        response = await self.async_client.get('/dashboard/async/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
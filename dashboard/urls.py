@@ -1,11 +1,12 @@
 from django.urls import path
 
-from . import views
+from . import async_views, views
 
 app_name = "dashboard"
 
 urlpatterns = [
     path("", views.dashboard_index, name="index"),
+    path("async/", async_views.dashboard_index, name="async_index"),
 
     path("products/", views.product_list, name="product_list"),
     path("products/create/", views.product_create, name="product_create"),
@@ -14,6 +15,12 @@ urlpatterns = [
     path("products/<int:pk>/delete/", views.product_delete, name="product_delete"),
     path("products/<int:pk>/pdf/", views.export_product_pdf, name="export_product_pdf"),
     path("products/pdf/", views.export_products_pdf, name="export_products_pdf"),
+    path("products/pdf/cache-stats/", views.pdf_cache_stats, name="pdf_cache_stats"),
+    path("cache-stats/", views.read_cache_stats, name="read_cache_stats"),
+    path("products/export/<str:fmt>/", views.export_products_data, name="export_products_data"),
+    path("products/pdf/async/", views.export_products_pdf_async, name="export_products_pdf_async"),
+    path("reports/<uuid:job_id>/", views.report_status, name="report_status"),
+    path("reports/<uuid:job_id>/download/", views.report_download, name="report_download"),
 
     path("categories/", views.category_list, name="category_list"),
     path("categories/create/", views.category_create, name="category_create"),
@@ -5,140 +5,165 @@ from reportlab.lib import colors
 from reportlab.lib.units import inch
 from io import BytesIO
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+import math
+import multiprocessing
+import tempfile
+from django.conf import settings
 from django.utils import timezone
 
+from .pdf_parts import (
+    DOC_OPTIONS,
+    PDF_ROWS_PER_PAGE,
+    FlowableStream,
+    product_table,
+    render_cover_part,
+    render_rows_part,
+    report_styles,
+    summary_table,
+)
+from .services import get_product_stats
 
-def generate_product_pdf(products, title="Product Report"):
+
+# Rows fetched per database round-trip when exporting
+PDF_QUERY_CHUNK_SIZE = 2000
+# Rows per table flowable; roughly one A4 page
+PDF_ROWS_PER_TABLE = 40
+# Reports larger than this are spooled to a temporary file instead of memory
+PDF_SPOOL_MAX_SIZE = 10 * 1024 * 1024
+# Bump whenever generate_single_product_pdf's layout changes, so cached PDFs are regenerated
+SINGLE_PRODUCT_PDF_VERSION = 1
+# Pages rendered by one worker task in parallel mode
+PDF_PAGES_PER_PART = 25
+# Smaller reports are rendered in-process; spawning workers would cost more than it saves
+PDF_PARALLEL_MIN_ROWS = 5000
+
+
+def _product_row(product):
+    return [
+        str(product.id),
+        product.name[:30] + '...' if len(product.name) > 30 else product.name,
+        product.category.name if product.category else 'N/A',
+        f"Rs. {product.price:.2f}",
+        product.get_status_display(),
+        str(product.stock_quantity) if hasattr(product, 'stock_quantity') else 'N/A',
+        product.created_at.strftime("%Y-%m-%d") if product.created_at else 'N/A'
+    ]
+
+
+def _product_rows(products):
+    return (
+        _product_row(product)
+        for product in products.select_related('category').iterator(chunk_size=PDF_QUERY_CHUNK_SIZE)
+    )
+
+
+def _product_tables(products):
+    """Yield page-sized tables while iterating the queryset in chunks"""
+    rows = []
+    emitted = False
+    for row in _product_rows(products):
+        rows.append(row)
+        if len(rows) == PDF_ROWS_PER_TABLE:
+            yield product_table(rows)
+            rows = []
+            emitted = True
+    if rows or not emitted:
+        yield product_table(rows)
+
+
+def generate_product_pdf(products, title="Product Report", workers=None):
     """
     Generate PDF for products (single or multiple)
     
+    Products are streamed from the database in chunks and laid out as
+    page-sized tables, so memory use does not grow with the row count.
+    Large reports are rendered in parallel when PDF_RENDER_WORKERS > 1
+    (see _generate_product_pdf_parallel).
+    
     Args:
         products: QuerySet of Product objects
         title: Title for the PDF document
+        workers: Worker processes to render with (defaults to settings.PDF_RENDER_WORKERS)
     
     Returns:
-        BytesIO buffer containing PDF data
+        Spooled temporary file containing PDF data, positioned at the start
     """
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-    
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        alignment=1,  # Center alignment
-        textColor=colors.darkblue
-    )
-    
-    subtitle_style = ParagraphStyle(
-        'CustomSubtitle',
-        parent=styles['Heading2'],
-        fontSize=14,
-        spaceAfter=20,
-        alignment=1,
-        textColor=colors.grey
-    )
-    
-    story = []
-    
-    # Title
-    story.append(Paragraph(title, title_style))
-    
-    # Generated timestamp
-    current_time = timezone.now().strftime("%Y-%m-%d %H:%M:%S")
-    story.append(Paragraph(f"Generated on: {current_time}", subtitle_style))
-    story.append(Spacer(1, 20))
-    
-    # Products data
-    data = []
-    
-    # Table headers
-    headers = ['ID', 'Name', 'Category', 'Price', 'Status', 'Stock', 'Created Date']
-    data.append(headers)
-    
-    # Product data
-    for product in products:
-        row = [
-            str(product.id),
-            product.name[:30] + '...' if len(product.name) > 30 else product.name,
-            product.category.name if product.category else 'N/A',
-            f"Rs. {product.price:.2f}",
-            product.get_status_display(),
-            str(product.stock_quantity) if hasattr(product, 'stock_quantity') else 'N/A',
-            product.created_at.strftime("%Y-%m-%d") if product.created_at else 'N/A'
-        ]
-        data.append(row)
-    
-    # Create table
-    table = Table(data, colWidths=[0.5*inch, 2*inch, 1.2*inch, 0.8*inch, 1*inch, 0.8*inch, 1*inch])
-    
-    # Style the table
-    style = TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4F46E5')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F9FAFB')),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#E5E7EB')),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 10),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ])
-    
-    table.setStyle(style)
-    
-    # Alternate row colors
-    row_count = len(data)
-    for i in range(1, row_count):
-        if i % 2 == 0:
-            bc = colors.HexColor('#FFFFFF')
-        else:
-            bc = colors.HexColor('#F9FAFB')
-        ts = TableStyle([('BACKGROUND', (0, i), (-1, i), bc)])
-        table.setStyle(ts)
-    
-    story.append(table)
+    if workers is None:
+        workers = getattr(settings, 'PDF_RENDER_WORKERS', 0)
+    stats = get_product_stats(products)
+    if workers > 1 and stats['total_products'] >= PDF_PARALLEL_MIN_ROWS:
+        return _generate_product_pdf_parallel(products, title, stats, workers)
+
+    buffer = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_SIZE)
+    doc = SimpleDocTemplate(buffer, **DOC_OPTIONS)
+    title_style, subtitle_style = report_styles()
     
-    # Add summary if multiple products
-    if products.count() > 1:
-        story.append(Spacer(1, 20))
+    def story():
+        # Title
+        yield Paragraph(title, title_style)
         
-        total_products = products.count()
-        total_value = sum(p.price for p in products)
-        in_stock = products.filter(status='in_stock').count()
-        out_of_stock = products.filter(status='out_of_stock').count()
+        # Generated timestamp
+        current_time = timezone.now().strftime("%Y-%m-%d %H:%M:%S")
+        yield Paragraph(f"Generated on: {current_time}", subtitle_style)
+        yield Spacer(1, 20)
         
-        summary_data = [
-            ['Summary Statistics', ''],
-            ['Total Products', str(total_products)],
-            ['Total Value', f"Rs. {total_value:.2f}"],
-            ['In Stock', str(in_stock)],
-            ['Out of Stock', str(out_of_stock)],
-        ]
+        # Products data, one page-sized table at a time
+        yield from _product_tables(products)
         
-        summary_table = Table(summary_data, colWidths=[2*inch, 1.5*inch])
-        summary_style = TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#10B981')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F0FDF4')),
-            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#D1FAE5')),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 10),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ])
-        summary_table.setStyle(summary_style)
-        story.append(summary_table)
+        # Add summary if multiple products
+        if stats['total_products'] > 1:
+            yield Spacer(1, 20)
+            yield summary_table(stats)
     
-    # Build PDF
-    doc.build(story)
+    # Build PDF, feeding ReportLab the story as it is consumed
+    doc.build(FlowableStream(story()))
+    buffer.seek(0)
+    return buffer
+
+
+def _generate_product_pdf_parallel(products, title, stats, workers):
+    """
+    Render a products report across worker processes and merge the parts
+
+    Page 1 carries the title and summary; every following page holds a
+    fixed PDF_ROWS_PER_PAGE rows, so the total page count is known up front
+    and each part can print its own "Page X of Y" footer. Rows are read in
+    the parent (workers never touch the database) and at most two parts
+    per worker are in flight, which keeps memory bounded.
+    """
+    from pypdf import PdfReader, PdfWriter
+
+    rows_per_part = PDF_ROWS_PER_PAGE * PDF_PAGES_PER_PART
+    total_pages = 1 + max(1, math.ceil(stats['total_products'] / PDF_ROWS_PER_PAGE))
+    current_time = timezone.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    writer = PdfWriter()
+    # spawn: forked workers would inherit the parent's open database connections
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        pending = deque([executor.submit(render_cover_part, title, current_time, stats, total_pages)])
+
+        def merge_ready(limit):
+            while len(pending) > limit:
+                writer.append(PdfReader(BytesIO(pending.popleft().result())))
+
+        rows = []
+        first_page = 2
+        for row in _product_rows(products):
+            rows.append(row)
+            if len(rows) == rows_per_part:
+                pending.append(executor.submit(render_rows_part, rows, first_page, total_pages))
+                first_page += PDF_PAGES_PER_PART
+                rows = []
+                merge_ready(workers * 2)
+        if rows or first_page == 2:
+            pending.append(executor.submit(render_rows_part, rows, first_page, total_pages))
+        merge_ready(0)
+
+    buffer = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_SIZE)
+    writer.write(buffer)
     buffer.seek(0)
     return buffer
 
@@ -1,17 +1,26 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.paginator import Paginator
-from django.http import HttpResponse, JsonResponse
-from django.db.models import Q, Sum, Count
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.utils import timezone
 from django.core.exceptions import PermissionDenied
 from functools import wraps
-import io
 
-from .models import Product, Category
+from .models import Product, Category, ReportJob
 from .forms import ProductForm, CategoryForm, ProductSearchForm
-from .utils import generate_product_pdf, generate_single_product_pdf
+from . import caching, pdf_cache
+from .conditional import (
+    catalog_validators, conditional, product_list_validators, product_validators
+)
+from .pagination import KeysetPaginator, estimate_count, querystring_without
+from .exports import EXPORT_FORMATS, build_xlsx, stream_csv, stream_ndjson
+from .queries import InvalidFilters, ProductQuery
+from .reports import enqueue_report
+from .services import get_product_stats
+from .utils import generate_product_pdf
 
 
 def admin_required(view_func):
@@ -25,36 +34,40 @@ def admin_required(view_func):
 
 
 @login_required
+@conditional(catalog_validators)
 def dashboard_index(request):
     """Dashboard home page with stats"""
     # Show all products for all users (global view)
-    products = Product.objects.all()
+    products = ProductQuery().queryset('list')
     categories = Category.objects.all().order_by('name')
     
-    # Statistics
-    stats = {
-        'total_products': products.count(),
-        'total_value': products.aggregate(total=Sum('price'))['total'] or 0,
-        'in_stock': products.filter(status='in_stock').count(),
-        'low_stock': products.filter(status='low_stock').count(),
-        'out_of_stock': products.filter(status='out_of_stock').count(),
-    }
+    # Statistics (single aggregate query)
+    stats = get_product_stats(products)
     
-    # Products pagination
-    products_list = products.order_by('-created_at')
-    products_paginator = Paginator(products_list, 5)
-    products_page_number = request.GET.get('products_page', 1)
-    products_page_obj = products_paginator.get_page(products_page_number)
+    # Products pagination (keyset)
+    products_paginator = KeysetPaginator(products, 5)
+    products_cursor = request.GET.get('products_cursor')
+    products_page_obj = caching.read_through(
+        'product_list', ('dashboard', products_cursor), lambda: products_paginator.get_page(products_cursor)
+    )
+    products_page_obj.count = stats['total_products']
     
-    # Categories pagination
-    categories_paginator = Paginator(categories, 5)
-    categories_page_number = request.GET.get('categories_page', 1)
-    categories_page_obj = categories_paginator.get_page(categories_page_number)
+    # Categories pagination (keyset)
+    categories_paginator = KeysetPaginator(
+        categories, 5, ordering=('name', 'id'), count=lambda: estimate_count(categories)
+    )
+    categories_cursor = request.GET.get('categories_cursor')
+    categories_page_obj = caching.read_through(
+        'category_list', ('dashboard', categories_cursor),
+        lambda: categories_paginator.get_page(categories_cursor), depends=('category',),
+    )
     
     context = {
         'stats': stats,
         'products': products_page_obj,
         'categories': categories_page_obj,
+        'products_query': querystring_without(request, 'products_cursor'),
+        'categories_query': querystring_without(request, 'categories_cursor'),
         'user': request.user,
     }
     return render(request, 'dashboard/dashboard.html', context)
@@ -62,37 +75,30 @@ def dashboard_index(request):
 # ===== PRODUCT CRUD OPERATIONS =====
 
 @login_required
+@conditional(product_list_validators)
 def product_list(request):
     """List all products"""
-    # Show all products for all users (global view)
-    products = Product.objects.all()
-    
-    # Search and filter
+    # Search and filter (all products, global view)
     form = ProductSearchForm(request.GET or None)
-    if form.is_valid():
-        search = form.cleaned_data.get('search')
-        category = form.cleaned_data.get('category')
-        status = form.cleaned_data.get('status')
-        
-        if search:
-            products = products.filter(
-                Q(name__icontains=search) | 
-                Q(description__icontains=search)
-            )
-        if category:
-            products = products.filter(category=category)
-        if status:
-            products = products.filter(status=status)
+    query = ProductQuery.from_form(form)
+    products = query.queryset('list')
     
-    # Pagination
-    paginator = Paginator(products, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Pagination (keyset, so deep pages cost the same as the first)
+    if query.filtered:
+        count = lambda: estimate_count(products)
+    else:
+        count = lambda: get_product_stats()['total_products']
+    paginator = KeysetPaginator(products, 10, ordering=query.ordering(products), count=count)
+    cursor = request.GET.get('cursor')
+    page_obj = caching.read_through(
+        'product_list', ('list', query.cache_key, cursor), lambda: paginator.get_page(cursor)
+    )
     
     context = {
         'products': page_obj,
         'form': form,
-        'total_products': products.count(),
+        'total_products': page_obj.count,
+        'query': querystring_without(request, 'cursor'),
     }
     return render(request, 'dashboard/product_list.html', context)
 
@@ -120,10 +126,14 @@ def product_create(request):
     return render(request, 'dashboard/product_form.html', context)
 
 @login_required
+@conditional(product_validators)
 def product_detail(request, pk):
     """View product details"""
     # All users can view any product
-    product = get_object_or_404(Product, pk=pk)
+    product = caching.read_through(
+        'product_detail', ('html', pk),
+        lambda: get_object_or_404(Product.objects.select_related('category'), pk=pk),
+    )
     return render(request, 'dashboard/product_detail.html', {'product': product})
 
 @login_required
@@ -166,18 +176,24 @@ def product_delete(request, pk):
 # ===== CATEGORY CRUD OPERATIONS =====
 
 @login_required
+@conditional(catalog_validators)
 def category_list(request):
     """List all categories"""
     categories = Category.objects.all()
     
-    # Pagination
-    paginator = Paginator(categories, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Pagination (keyset)
+    paginator = KeysetPaginator(
+        categories, 10, ordering=('name', 'id'), count=lambda: estimate_count(categories)
+    )
+    cursor = request.GET.get('cursor')
+    page_obj = caching.read_through(
+        'category_list', ('list', cursor), lambda: paginator.get_page(cursor), depends=('category',)
+    )
     
     context = {
         'categories': page_obj,
-        'total_categories': categories.count(),
+        'total_categories': page_obj.count,
+        'query': querystring_without(request, 'cursor'),
     }
     return render(request, 'dashboard/category_list.html', context)
 
@@ -216,47 +232,99 @@ def category_delete(request, pk):
 @login_required
 def export_products_pdf(request):
     """Export all products to PDF"""
-    # Export all products (global view)
-    products = Product.objects.all()
-    
-    # Apply same filters as product_list
-    form = ProductSearchForm(request.GET or None)
-    if form.is_valid():
-        search = form.cleaned_data.get('search')
-        category = form.cleaned_data.get('category')
-        status = form.cleaned_data.get('status')
-        
-        if search:
-            products = products.filter(
-                Q(name__icontains=search) | 
-                Q(description__icontains=search)
-            )
-        if category:
-            products = products.filter(category=category)
-        if status:
-            products = products.filter(status=status)
+    # Export all products (global view), with the same filters as product_list
+    try:
+        products = ProductQuery.from_params(request.GET).queryset('report')
+    except InvalidFilters as exc:
+        return JsonResponse(exc.errors, status=400)
     
-    # Generate PDF
-    pdf_buffer = generate_product_pdf(products, "Products Report")
+    # Generate PDF (spooled to disk for large reports)
+    pdf_file = generate_product_pdf(products, "Products Report")
     
-    # Create HTTP response
-    response = HttpResponse(pdf_buffer, content_type='application/pdf')
+    # Stream the finished document in blocks
     filename = f"products_report_{timezone.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return FileResponse(pdf_file, as_attachment=True, filename=filename, content_type='application/pdf')
+
+@login_required
+def export_products_data(request, fmt):
+    """Export products as CSV, NDJSON or XLSX, with the same filters as product_list"""
+    if fmt not in EXPORT_FORMATS:
+        raise Http404("Unknown export format")
+    content_type, extension = EXPORT_FORMATS[fmt]
+    try:
+        products = ProductQuery.from_params(request.GET).queryset('report')
+    except InvalidFilters as exc:
+        return JsonResponse(exc.errors, status=400)
+    filename = f"products_{timezone.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
     
+    if fmt == 'xlsx':
+        return FileResponse(build_xlsx(products), as_attachment=True, filename=filename, content_type=content_type)
+    
+    # Rows are written as they are read, so the export runs in constant memory
+    stream = stream_csv(products) if fmt == 'csv' else stream_ndjson(products)
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
     return response
 
+@login_required
+@require_POST
+def export_products_pdf_async(request):
+    """Queue a products PDF report for the background worker"""
+    try:
+        job = enqueue_report(request.user, request.GET)
+    except InvalidFilters as exc:
+        return JsonResponse(exc.errors, status=400)
+    return JsonResponse(_report_job_data(job), status=202)
+
+@login_required
+def report_status(request, job_id):
+    """Status of a queued PDF report"""
+    job = get_object_or_404(ReportJob, pk=job_id, created_by=request.user)
+    return JsonResponse(_report_job_data(job))
+
+@login_required
+def report_download(request, job_id):
+    """Download a finished PDF report"""
+    job = get_object_or_404(ReportJob, pk=job_id, created_by=request.user, status='done')
+    filename = f"products_report_{job.created_at.strftime('%Y%m%d_%H%M%S')}.pdf"
+    return FileResponse(job.file.open('rb'), as_attachment=True, filename=filename, content_type='application/pdf')
+
+def _report_job_data(job):
+    data = {
+        'id': str(job.pk),
+        'status': job.status,
+        'status_url': reverse('dashboard:report_status', args=[job.pk]),
+        'download_url': None,
+    }
+    if job.status == 'done':
+        data['download_url'] = reverse('dashboard:report_download', args=[job.pk])
+    return data
+
 @login_required
 def export_product_pdf(request, pk):
     """Export single product to PDF"""
-    product = get_object_or_404(Product, pk=pk, created_by=request.user)
-    
-    # Generate PDF
-    pdf_buffer = generate_single_product_pdf(product)
+    product = get_object_or_404(Product.objects.select_related('category'), pk=pk, created_by=request.user)
     
-    # Create HTTP response
-    response = HttpResponse(pdf_buffer, content_type='application/pdf')
-    filename = f"product_{product.id}_{product.name.replace(' ', '_')}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    # The cached PDF is addressed by the product's (and its category's) last change, so its key doubles as the ETag
+    etag = f'"{pdf_cache.cache_key(product)}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        pdf_path, key = pdf_cache.get_product_pdf(product)
+        filename = f"product_{product.id}_{product.name.replace(' ', '_')}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+        response = FileResponse(open(pdf_path, 'rb'), as_attachment=True, filename=filename, content_type='application/pdf')
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
     
-    return response
\ No newline at end of file
+    return response
+
+@login_required
+@admin_required
+def pdf_cache_stats(request):
+    """Hit/miss counters for the single-product PDF cache"""
+    return JsonResponse(pdf_cache.cache_stats())
+
+@login_required
+@admin_required
+def read_cache_stats(request):
+    """Hit/miss counters and hit ratios of the product/category read cache"""
+    return JsonResponse(caching.cache_stats())
\ No newline at end of file
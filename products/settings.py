@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 
 from pathlib import Path
 import os
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -137,3 +138,39 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 LOGIN_REDIRECT_URL = "dashboard:index"
 LOGOUT_REDIRECT_URL = "login"
+
+# Worker processes for rendering large PDF reports in parallel (0 or 1 renders in-process)
+PDF_RENDER_WORKERS = int(os.environ.get('PDF_RENDER_WORKERS', 0))
+
+# Read-through cache for product/category reads (dashboard.caching).
+# CACHE_BACKEND: file (default, shared by the processes of one host), redis
+# (shared by every host) or locmem (one process only: the cache invalidation
+# counters would not be shared between workers).
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'file')
+CACHE_TIMEOUT = int(os.environ.get('CACHE_TIMEOUT', 300))
+if CACHE_BACKEND == 'locmem' and int(os.environ.get('WEB_CONCURRENCY', 1)) > 1:
+    raise ImproperlyConfigured(
+        'CACHE_BACKEND=locmem cannot be used with several worker processes (WEB_CONCURRENCY); use file or redis'
+    )
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/0'),
+        }
+    }
+elif CACHE_BACKEND == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', BASE_DIR / 'cache'),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
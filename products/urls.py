@@ -6,12 +6,14 @@ from django.shortcuts import redirect
 from django.contrib.auth.decorators import login_required
 from rest_framework.routers import DefaultRouter
 
-from dashboard.api_views import ProductViewSet, CategoryViewSet
+from dashboard import async_views
+from dashboard.api_views import ProductViewSet, CategoryViewSet, ReportJobViewSet
 
 # REST API Router
 router = DefaultRouter()
 router.register(r'products', ProductViewSet, basename='api-products')
 router.register(r'categories', CategoryViewSet, basename='api-categories')
+router.register(r'reports', ReportJobViewSet, basename='api-reports')
 
 def root_view(request):
     if request.user.is_authenticated:
@@ -24,6 +26,10 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     path("accounts/", include("accounts.urls")),
     path('dashboard/', include('dashboard.urls')),
+    # Async (ASGI) versions of the read-heavy product endpoints
+    path('api/async/products/', async_views.product_list_api, name='async-products-list'),
+    path('api/async/products/stats/', async_views.product_stats_api, name='async-products-stats'),
+    path('api/async/products/<int:pk>/', async_views.product_detail_api, name='async-products-detail'),
     path('api/', include(router.urls)),
 ]
 